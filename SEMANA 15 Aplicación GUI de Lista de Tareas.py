@@ -1,17 +1,134 @@
+import json
+import os
+import queue
+import threading
 import tkinter as tk
+from itertools import islice
 from tkinter import messagebox
 
+COLOR_COMPLETADA = "gray"
+ARCHIVO_TAREAS = "tareas.jsonl"   # Una tarea por línea: ["texto", completada]
+PRIMERA_PANTALLA = 100            # Tareas que se cargan antes de mostrar la ventana
+TAREAS_POR_BLOQUE = 2000          # El resto se carga de a bloques con root.after
+RETARDO_AUTOGUARDADO_MS = 1000    # Espera tras el último cambio antes de guardar
+
+
+# =========================
+# Modelo de tarea
+# =========================
+class Tarea:
+    # __slots__: sin diccionario por instancia, menos memoria con miles de tareas
+    __slots__ = ("texto", "completada")
+
+    def __init__(self, texto, completada=False):
+        self.texto = texto
+        self.completada = completada
+
+    def texto_visible(self):
+        return "✔ " + self.texto if self.completada else self.texto  # Check al inicio si está completada
+
+
+# =========================
+# Persistencia
+# =========================
+def leer_tareas(archivo, cantidad=None):
+    """Lee hasta `cantidad` líneas (todas si es None). Retorna (tareas, líneas leídas)."""
+    tareas = []
+    leidas = 0
+    for linea in islice(archivo, cantidad):
+        leidas += 1
+        try:
+            texto, completada = json.loads(linea)
+            tareas.append(Tarea(str(texto), bool(completada)))
+        except (ValueError, TypeError):
+            continue  # línea dañada: se omite
+    return tareas, leidas
+
+
+def escribir_tareas(filas, ruta):
+    """Escribe [(texto, completada)] como JSONL de forma atómica (temporal + fsync + rename)."""
+    tmp = ruta + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps([texto, completada], ensure_ascii=False) + "\n" for texto, completada in filas)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, ruta)
+
+
+class GuardadoEnSegundoPlano:
+    """
+    Hilo que escribe el archivo de tareas fuera del mainloop de Tk.
+    Si llegan varias copias antes de que empiece a escribir, solo guarda la última.
+    Los errores quedan en `resultados` para revisarlos desde la interfaz.
+    """
+    def __init__(self, ruta=ARCHIVO_TAREAS):
+        self.ruta = ruta
+        self.resultados = queue.Queue()
+        self._cond = threading.Condition()
+        self._pendiente = None
+        self._escribiendo = False
+        self._detener = False
+        self._hilo = threading.Thread(target=self._trabajar, name="guardado-tareas", daemon=True)
+        self._hilo.start()
+
+    def solicitar(self, filas):
+        with self._cond:
+            self._pendiente = filas
+            self._cond.notify()
+
+    def ocupado(self):
+        with self._cond:
+            return self._pendiente is not None or self._escribiendo
+
+    def detener(self):
+        """Termina el hilo después de escribir lo que esté pendiente."""
+        with self._cond:
+            self._detener = True
+            self._cond.notify()
+        self._hilo.join()
+
+    def _trabajar(self):
+        while True:
+            with self._cond:
+                while self._pendiente is None and not self._detener:
+                    self._cond.wait()
+                if self._pendiente is None:
+                    return
+                filas, self._pendiente = self._pendiente, None
+                self._escribiendo = True
+            try:
+                escribir_tareas(filas, self.ruta)
+                error = None
+            except Exception as e:  # cualquier fallo se informa; el hilo sigue vivo
+                error = e
+            with self._cond:
+                # El resultado entra antes de bajar la bandera: quien vea ocupado() == False
+                # ya lo encuentra en la cola
+                self.resultados.put(error)
+                self._escribiendo = False
+
+
+def rangos_consecutivos(indices):
+    """Agrupa índices ordenados en rangos (primero, último) de posiciones consecutivas."""
+    rangos = []
+    for i in indices:
+        if rangos and rangos[-1][1] == i - 1:
+            rangos[-1][1] = i
+        else:
+            rangos.append([i, i])
+    return rangos
+
 # =========================
 # Clase principal de la aplicación
 # =========================
 class ListaTareasApp:
-    def __init__(self, root):
+    def __init__(self, root, ruta=ARCHIVO_TAREAS):
         self.root = root
         self.root.title("Lista de Tareas")
         self.root.geometry("400x400")
         self.root.resizable(False, False)
 
-        # Lista donde se guardarán las tareas y su estado
+        # Lista de objetos Tarea, en el mismo orden que las filas del Listbox
         self.tareas = []
 
         # =========================
@@ -37,51 +154,174 @@ class ListaTareasApp:
         # =========================
         # Listbox para mostrar tareas
         # =========================
-        self.listbox = tk.Listbox(self.root, width=50, height=15, selectmode=tk.SINGLE)
+        self.listbox = tk.Listbox(self.root, width=50, height=15, selectmode=tk.EXTENDED)
         self.listbox.pack(pady=10)
         self.listbox.bind("<Double-Button-1>", self.marcar_completada)  # Doble clic para completar
 
+        # =========================
+        # Persistencia: carga por bloques y autoguardado en segundo plano
+        # =========================
+        self.ruta = ruta
+        self.guardador = GuardadoEnSegundoPlano(ruta)
+        self._guardado_id = None
+        self._cambios_pendientes = False
+        self._revisando = False
+        self._archivo_carga = None
+        self._fin_cargadas = 0  # Posición donde se insertan los siguientes bloques leídos
+        self.root.protocol("WM_DELETE_WINDOW", self.cerrar)
+        self.iniciar_carga()
+
     # =========================
     # Funciones de la aplicación
     # =========================
+    # Cada operación toca solo las filas afectadas del Listbox, nunca la lista entera
     def agregar_tarea(self, event=None):
         """Agrega una nueva tarea a la lista."""
-        tarea = self.entry_tarea.get().strip()
-        if tarea:
-            self.tareas.append({"texto": tarea, "completada": False})
+        texto = self.entry_tarea.get().strip()
+        if texto:
+            self.tareas.append(Tarea(texto))
+            self.listbox.insert(tk.END, texto)
+            self.listbox.see(tk.END)
             self.entry_tarea.delete(0, tk.END)
-            self.actualizar_lista()
+            self.programar_guardado()
         else:
             messagebox.showwarning("Advertencia", "Por favor, escribe una tarea antes de añadirla.")
 
     def marcar_completada(self, event=None):
-        """Marca la tarea seleccionada como completada (o la desmarca)."""
+        """
+        Marca las tareas seleccionadas como completadas. Si todas ya lo estaban,
+        las desmarca (con una sola tarea equivale a alternar su estado).
+        """
         seleccion = self.listbox.curselection()
         if seleccion:
-            indice = seleccion[0]
-            self.tareas[indice]["completada"] = not self.tareas[indice]["completada"]
-            self.actualizar_lista()
+            completar = not all(self.tareas[i].completada for i in seleccion)
+            for indice in seleccion:
+                if self.tareas[indice].completada != completar:
+                    self.tareas[indice].completada = completar
+                    self.pintar_fila(indice)
+            for indice in seleccion:
+                self.listbox.selection_set(indice)  # Reemplazar la fila pierde la selección
+            self.programar_guardado()
         else:
             messagebox.showinfo("Información", "Selecciona una tarea para marcarla como completada.")
 
     def eliminar_tarea(self):
-        """Elimina la tarea seleccionada."""
+        """Elimina las tareas seleccionadas."""
         seleccion = self.listbox.curselection()
         if seleccion:
-            indice = seleccion[0]
-            self.tareas.pop(indice)
-            self.actualizar_lista()
+            # De atrás hacia adelante para no desplazar los índices pendientes,
+            # y cada bloque de filas consecutivas en una sola llamada
+            for primero, ultimo in reversed(rangos_consecutivos(seleccion)):
+                del self.tareas[primero:ultimo + 1]
+                self.listbox.delete(primero, ultimo)
+                # Las tareas borradas antes del punto de carga lo desplazan
+                self._fin_cargadas -= max(0, min(ultimo + 1, self._fin_cargadas) - primero)
+            self.programar_guardado()
         else:
             messagebox.showinfo("Información", "Selecciona una tarea para eliminarla.")
 
+    def pintar_fila(self, indice):
+        """Vuelve a dibujar solo la fila `indice` según el estado de su tarea."""
+        tarea = self.tareas[indice]
+        self.listbox.delete(indice)
+        self.listbox.insert(indice, tarea.texto_visible())
+        if tarea.completada:
+            self.listbox.itemconfig(indice, fg=COLOR_COMPLETADA)
+
     def actualizar_lista(self):
-        """Actualiza el contenido visual del Listbox."""
+        """Redibuja todo el Listbox (solo para cargas completas)."""
         self.listbox.delete(0, tk.END)
-        for tarea in self.tareas:
-            texto = tarea["texto"]
-            if tarea["completada"]:
-                texto = "✔ " + texto  # Agregar un check al inicio
-            self.listbox.insert(tk.END, texto)
+        self.listbox.insert(tk.END, *(tarea.texto_visible() for tarea in self.tareas))
+        for indice, tarea in enumerate(self.tareas):
+            if tarea.completada:
+                self.listbox.itemconfig(indice, fg=COLOR_COMPLETADA)
+
+    # =========================
+    # Carga perezosa
+    # =========================
+    def iniciar_carga(self):
+        """Muestra enseguida la primera pantalla de tareas; el resto llega con root.after."""
+        if not os.path.exists(self.ruta):
+            return
+        self._archivo_carga = open(self.ruta, "r", encoding="utf-8")
+        self.cargar_bloque(PRIMERA_PANTALLA)
+
+    def cargar_bloque(self, cantidad=TAREAS_POR_BLOQUE):
+        nuevas, leidas = leer_tareas(self._archivo_carga, cantidad)
+        if nuevas:
+            # Van antes de las tareas que el usuario haya agregado mientras tanto
+            inicio = self._fin_cargadas
+            self.tareas[inicio:inicio] = nuevas
+            self.listbox.insert(inicio, *(tarea.texto_visible() for tarea in nuevas))
+            for desplazamiento, tarea in enumerate(nuevas):
+                if tarea.completada:
+                    self.listbox.itemconfig(inicio + desplazamiento, fg=COLOR_COMPLETADA)
+            self._fin_cargadas += len(nuevas)
+        if leidas < cantidad:
+            self.terminar_carga()
+        else:
+            self.root.after(1, self.cargar_bloque)
+
+    def terminar_carga(self):
+        self._archivo_carga.close()
+        self._archivo_carga = None
+        if self._cambios_pendientes:
+            self.programar_guardado()
+
+    # =========================
+    # Autoguardado
+    # =========================
+    def programar_guardado(self):
+        """Reinicia la espera: se guarda cuando pasan RETARDO_AUTOGUARDADO_MS sin cambios."""
+        self._cambios_pendientes = True
+        if self._guardado_id is not None:
+            self.root.after_cancel(self._guardado_id)
+        self._guardado_id = self.root.after(RETARDO_AUTOGUARDADO_MS, self.guardar)
+
+    def guardar(self):
+        self._guardado_id = None
+        if self._archivo_carga is not None:
+            return  # Aún falta cargar parte del archivo; terminar_carga vuelve a programarlo
+        self._cambios_pendientes = False
+        # Copia del estado actual; la conversión a JSON y la escritura van en el hilo
+        self.guardador.solicitar([(tarea.texto, tarea.completada) for tarea in self.tareas])
+        if not self._revisando:
+            self._revisando = True
+            self.root.after(200, self.revisar_guardado)
+
+    def revisar_guardado(self):
+        """Recoge en el hilo de Tk los resultados del hilo de guardado."""
+        # Se pregunta antes de vaciar la cola: si el hilo termina entre medio, su
+        # resultado ya está en la cola cuando se lee
+        ocupado = self.guardador.ocupado()
+        while True:
+            try:
+                error = self.guardador.resultados.get_nowait()
+            except queue.Empty:
+                break
+            if error is not None:
+                messagebox.showerror("Error", f"No se pudieron guardar las tareas: {error}")
+        if ocupado:
+            self.root.after(200, self.revisar_guardado)
+        else:
+            self._revisando = False
+
+    def cerrar(self):
+        """Guarda lo pendiente (esperando al hilo) y cierra la ventana."""
+        if self._guardado_id is not None:
+            self.root.after_cancel(self._guardado_id)
+            self._guardado_id = None
+        if self._archivo_carga is not None:
+            # Sin interfaz de por medio: el resto del archivo pasa directo a la lista
+            nuevas, _ = leer_tareas(self._archivo_carga)
+            self.tareas[self._fin_cargadas:self._fin_cargadas] = nuevas
+            self._archivo_carga.close()
+            self._archivo_carga = None
+        if self._cambios_pendientes:
+            self._cambios_pendientes = False
+            self.guardador.solicitar([(tarea.texto, tarea.completada) for tarea in self.tareas])
+        self.guardador.detener()
+        self.root.destroy()
 
 
 # =========================
@@ -3,6 +3,90 @@
 # Todo en un solo archivo
 # ==============================
 
+import atexit
+import sys
+from enum import Enum
+
+
+# Eventos que emite el Inventario en lugar de imprimir
+class TipoEvento(Enum):
+    AGREGADO = "agregado"
+    ID_EXISTENTE = "id_existente"
+    CARGA_MASIVA = "carga_masiva"
+    ELIMINADO = "eliminado"
+    ACTUALIZADO = "actualizado"
+    NO_ENCONTRADO = "no_encontrado"
+
+
+class Evento:
+    def __init__(self, tipo, id_producto=None, producto=None, cantidad=None):
+        self.tipo = tipo
+        self.id_producto = id_producto
+        self.producto = producto
+        self.cantidad = cantidad  # Solo en CARGA_MASIVA: productos agregados
+
+    def __str__(self):
+        return MENSAJES[self.tipo].format(e=self)
+
+
+MENSAJES = {
+    TipoEvento.AGREGADO: "✅ Producto agregado.",
+    TipoEvento.ID_EXISTENTE: "❌ Error: El ID ya existe.",
+    TipoEvento.CARGA_MASIVA: "✅ {e.cantidad} producto(s) agregado(s).",
+    TipoEvento.ELIMINADO: "✅ Producto eliminado.",
+    TipoEvento.ACTUALIZADO: "✅ Producto actualizado.",
+    TipoEvento.NO_ENCONTRADO: "❌ Producto no encontrado.",
+}
+
+
+def mostrar_en_consola(evento):
+    print(evento)
+
+
+# Guarda los mensajes y los escribe todos juntos cada `capacidad` eventos
+class RegistroEnBuffer:
+    """
+    Suscriptor para operaciones masivas: acumula los eventos de Inventario y los
+    escribe en `archivo` de a `capacidad` líneas. Se usa como context manager, que
+    escribe lo pendiente al salir del bloque:
+
+        with RegistroEnBuffer(open("inventario.log", "a", encoding="utf-8")) as registro:
+            inventario.suscribir(registro)
+            ...
+
+    Sin `with` hay que llamar a vaciar() al terminar. Como respaldo, solo mientras
+    tiene líneas pendientes queda registrado en atexit.
+    """
+    def __init__(self, archivo=None, capacidad=1000):
+        self.archivo = archivo or sys.stdout
+        self.capacidad = capacidad
+        self.lineas = []
+
+    def __call__(self, evento):
+        if not self.lineas:
+            atexit.register(self._al_salir)
+        self.lineas.append(str(evento))
+        if len(self.lineas) >= self.capacidad:
+            self.vaciar()
+
+    def vaciar(self):
+        if self.lineas:
+            self.archivo.write("\n".join(self.lineas) + "\n")
+            self.archivo.flush()
+            self.lineas.clear()
+            atexit.unregister(self._al_salir)  # ya no hace falta retenerlo hasta el final
+
+    def _al_salir(self):
+        # El archivo pudo cerrarse antes que el programa: entonces no hay dónde escribir
+        if not getattr(self.archivo, "closed", False):
+            self.vaciar()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.vaciar()
+
 # Clase Producto
 class Producto:
     def __init__(self, id_producto, nombre, cantidad, precio):
@@ -37,61 +121,90 @@ class Producto:
 
 
 # Clase Inventario
+# Los productos se guardan en un diccionario {id: Producto}: mantiene el
+# orden de inserción y permite buscar, agregar y eliminar por ID en O(1).
+# Los mensajes no se imprimen aquí: se avisa a los suscriptores (ninguno por defecto).
 class Inventario:
     def __init__(self):
-        self.productos = []
+        self.productos = {}
+        self.suscriptores = []
+
+    def suscribir(self, suscriptor):
+        self.suscriptores.append(suscriptor)
+
+    def _emitir(self, tipo, **datos):
+        if self.suscriptores:
+            evento = Evento(tipo, **datos)
+            for suscriptor in self.suscriptores:
+                suscriptor(evento)
 
     def agregar_producto(self, producto):
-        for p in self.productos:
-            if p.get_id() == producto.get_id():
-                print("❌ Error: El ID ya existe.")
-                return False
-        self.productos.append(producto)
-        print("✅ Producto agregado.")
+        if producto.get_id() in self.productos:
+            self._emitir(TipoEvento.ID_EXISTENTE, id_producto=producto.get_id())
+            return False
+        self.productos[producto.get_id()] = producto
+        self._emitir(TipoEvento.AGREGADO, id_producto=producto.get_id(), producto=producto)
         return True
 
+    def agregar_productos(self, productos):
+        """Carga masiva: agrega todos los productos con ID nuevo y devuelve cuántos entraron."""
+        agregados = 0
+        for producto in productos:
+            id_producto = producto.get_id()
+            if id_producto not in self.productos:
+                self.productos[id_producto] = producto
+                agregados += 1
+        self._emitir(TipoEvento.CARGA_MASIVA, cantidad=agregados)
+        return agregados
+
+    def obtener_producto(self, id_producto):
+        return self.productos.get(id_producto)
+
     def eliminar_producto(self, id_producto):
-        for p in self.productos:
-            if p.get_id() == id_producto:
-                self.productos.remove(p)
-                print("✅ Producto eliminado.")
-                return True
-        print("❌ Producto no encontrado.")
+        producto = self.productos.pop(id_producto, None)
+        if producto is not None:
+            self._emitir(TipoEvento.ELIMINADO, id_producto=id_producto, producto=producto)
+            return True
+        self._emitir(TipoEvento.NO_ENCONTRADO, id_producto=id_producto)
         return False
 
     def actualizar_producto(self, id_producto, nueva_cantidad=None, nuevo_precio=None):
-        for p in self.productos:
-            if p.get_id() == id_producto:
-                if nueva_cantidad is not None:
-                    p.set_cantidad(nueva_cantidad)
-                if nuevo_precio is not None:
-                    p.set_precio(nuevo_precio)
-                print("✅ Producto actualizado.")
-                return True
-        print("❌ Producto no encontrado.")
-        return False
+        p = self.productos.get(id_producto)
+        if p is None:
+            self._emitir(TipoEvento.NO_ENCONTRADO, id_producto=id_producto)
+            return False
+        if nueva_cantidad is not None:
+            p.set_cantidad(nueva_cantidad)
+        if nuevo_precio is not None:
+            p.set_precio(nuevo_precio)
+        self._emitir(TipoEvento.ACTUALIZADO, id_producto=id_producto, producto=p)
+        return True
 
     def buscar_por_nombre(self, nombre):
-        return [p for p in self.productos if nombre.lower() in p.get_nombre().lower()]
+        nombre = nombre.lower()
+        return [p for p in self.productos.values() if nombre in p.get_nombre().lower()]
 
     def mostrar_todos(self):
         if not self.productos:
             print("📦 El inventario está vacío.")
         else:
-            for p in self.productos:
+            for p in self.productos.values():
                 print(p)
 
 
 # Menú principal
 def menu():
     inventario = Inventario()
+    inventario.suscribir(mostrar_en_consola)
 
     # Productos precargados
-    inventario.agregar_producto(Producto("P001", "Arroz", 50, 1.20))
-    inventario.agregar_producto(Producto("P002", "Azúcar", 30, 0.95))
-    inventario.agregar_producto(Producto("P003", "Aceite", 20, 3.50))
-    inventario.agregar_producto(Producto("P004", "Leche", 40, 0.80))
-    inventario.agregar_producto(Producto("P005", "Huevos", 60, 0.10))
+    inventario.agregar_productos([
+        Producto("P001", "Arroz", 50, 1.20),
+        Producto("P002", "Azúcar", 30, 0.95),
+        Producto("P003", "Aceite", 20, 3.50),
+        Producto("P004", "Leche", 40, 0.80),
+        Producto("P005", "Huevos", 60, 0.10),
+    ])
 
     while True:
         print("\n===== 📋 MENÚ DE INVENTARIO =====")
@@ -150,7 +263,35 @@ def menu():
             print("⚠️ Opción no válida.")
 
 
+# Benchmark de carga masiva: python "SEMANA 9.py" --benchmark [N]
+def benchmark(n=1_000_000):
+    import time
+
+    inventario = Inventario()
+    productos = (Producto(f"P{i:07d}", f"Producto {i}", i % 100, 1.0) for i in range(n))
+    inicio = time.perf_counter()
+    inventario.agregar_productos(productos)
+    carga = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for i in range(n):
+        inventario.obtener_producto(f"P{i:07d}")
+    busqueda = time.perf_counter() - inicio
+
+    # Sin suscriptores no se formatea ni imprime nada: se mide solo la estructura
+    inicio = time.perf_counter()
+    for i in range(0, n, 2):
+        inventario.eliminar_producto(f"P{i:07d}")
+    borrado = time.perf_counter() - inicio
+
+    print(f"⏱️ {n} inserciones: {carga:.2f} s | {n} búsquedas: {busqueda:.2f} s | "
+          f"{n // 2} eliminaciones: {borrado:.2f} s")
+
+
 if __name__ == "__main__":
-    menu()
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark":
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000)
+    else:
+        menu()
 
 
@@ -2,6 +2,137 @@
 # Sistema de Gestión de Biblioteca Digital
 # ==============================
 
+import atexit
+import csv
+import gc
+import heapq
+import json
+import os
+import re
+import sqlite3
+import sys
+from bisect import bisect_left, insort
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from enum import Enum
+from itertools import islice
+
+DIAS_PRESTAMO = 14
+CAMPOS_LIBRO = ("titulo", "autor", "categoria", "isbn")
+LINEAS_POR_BLOQUE = 50000   # Tamaño de los bloques que se reparten entre procesos al importar
+MAX_EJEMPLOS_ERROR = 10
+
+# ==============================
+# Eventos: la Biblioteca no imprime, avisa a sus suscriptores
+# ==============================
+class TipoEvento(Enum):
+    LIBRO_AGREGADO = "libro_agregado"
+    LIBRO_EXISTENTE = "libro_existente"
+    LIBRO_ELIMINADO = "libro_eliminado"
+    LIBRO_NO_ENCONTRADO = "libro_no_encontrado"
+    USUARIO_REGISTRADO = "usuario_registrado"
+    USUARIO_EXISTENTE = "usuario_existente"
+    USUARIO_DADO_DE_BAJA = "usuario_dado_de_baja"
+    USUARIO_NO_ENCONTRADO = "usuario_no_encontrado"
+    USUARIO_NO_REGISTRADO = "usuario_no_registrado"
+    LIBRO_NO_DISPONIBLE = "libro_no_disponible"
+    LIBRO_PRESTADO = "libro_prestado"
+    LIBRO_DEVUELTO = "libro_devuelto"
+    DEVOLUCION_INVALIDA = "devolucion_invalida"
+    CATALOGO_IMPORTADO = "catalogo_importado"
+
+
+class Evento:
+    def __init__(self, tipo, **datos):
+        self.tipo = tipo
+        self.datos = datos  # libro, usuario, isbn, resumen... según el tipo
+
+    def __str__(self):
+        return formatear_evento(self)
+
+
+def _mensaje_importacion(d):
+    r = d["resumen"]
+    lineas = [f"📥 Importación de {d['ruta']}: {r['importados']} libros nuevos, "
+              f"{r['existentes']} ya existentes, {r['duplicados']} ISBN duplicados, "
+              f"{r['errores']} filas con error"]
+    lineas += [f"   ⚠️ Línea {numero}: {motivo}" for numero, motivo in r["ejemplos_error"]]
+    return "\n".join(lineas)
+
+
+MENSAJES = {
+    TipoEvento.LIBRO_AGREGADO: "✅ Libro agregado: {libro}",
+    TipoEvento.LIBRO_EXISTENTE: "❌ El libro con ISBN {isbn} ya existe.",
+    TipoEvento.LIBRO_ELIMINADO: "🗑️ Libro eliminado: {libro}",
+    TipoEvento.LIBRO_NO_ENCONTRADO: "❌ No se encontró el libro con ISBN {isbn}",
+    TipoEvento.USUARIO_REGISTRADO: "✅ Usuario registrado: {usuario}",
+    TipoEvento.USUARIO_EXISTENTE: "❌ El usuario con ID {user_id} ya está registrado.",
+    TipoEvento.USUARIO_DADO_DE_BAJA: "🗑️ Usuario dado de baja: {usuario}",
+    TipoEvento.USUARIO_NO_ENCONTRADO: "❌ No se encontró el usuario con ID {user_id}",
+    TipoEvento.USUARIO_NO_REGISTRADO: "❌ Usuario no registrado.",
+    TipoEvento.LIBRO_NO_DISPONIBLE: "❌ Libro no disponible.",
+    TipoEvento.LIBRO_PRESTADO: "📚 Libro prestado: {libro} a {usuario.nombre}",
+    TipoEvento.LIBRO_DEVUELTO: "🔄 Libro devuelto: {libro} por {usuario.nombre}",
+    TipoEvento.DEVOLUCION_INVALIDA: "❌ El usuario {usuario.nombre} no tiene prestado el libro con ISBN {isbn}",
+    TipoEvento.CATALOGO_IMPORTADO: _mensaje_importacion,
+}
+
+
+def formatear_evento(evento):
+    plantilla = MENSAJES[evento.tipo]
+    return plantilla(evento.datos) if callable(plantilla) else plantilla.format(**evento.datos)
+
+
+def mostrar_en_consola(evento):
+    """Suscriptor que reproduce los mensajes de siempre por pantalla."""
+    print(formatear_evento(evento))
+
+
+class RegistroEnBuffer:
+    """
+    Suscriptor para operaciones masivas: acumula los eventos de Biblioteca y los
+    escribe en `archivo` de a `capacidad` líneas. Se usa como context manager, que
+    escribe lo pendiente al salir del bloque:
+
+        with RegistroEnBuffer(open("biblioteca.log", "a", encoding="utf-8")) as registro:
+            biblio.suscribir(registro)
+            ...
+
+    Sin `with` hay que llamar a vaciar() al terminar. Como respaldo, solo mientras
+    tiene líneas pendientes queda registrado en atexit.
+    """
+    def __init__(self, archivo=None, capacidad=1000):
+        self.archivo = archivo or sys.stdout
+        self.capacidad = capacidad
+        self.lineas = []
+
+    def __call__(self, evento):
+        if not self.lineas:
+            atexit.register(self._al_salir)
+        self.lineas.append(str(evento))
+        if len(self.lineas) >= self.capacidad:
+            self.vaciar()
+
+    def vaciar(self):
+        if self.lineas:
+            self.archivo.write("\n".join(self.lineas) + "\n")
+            self.archivo.flush()
+            self.lineas.clear()
+            atexit.unregister(self._al_salir)  # ya no hace falta retenerlo hasta el final
+
+    def _al_salir(self):
+        # El archivo pudo cerrarse antes que el programa: entonces no hay dónde escribir
+        if not getattr(self.archivo, "closed", False):
+            self.vaciar()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.vaciar()
+
+
 # Clase Libro
 class Libro:
     def __init__(self, titulo, autor, categoria, isbn):
@@ -19,115 +150,751 @@ class Usuario:
     def __init__(self, nombre, user_id):
         self.nombre = nombre
         self.user_id = user_id
-        self.libros_prestados = []  # Lista de libros prestados
+        self.libros_prestados = {}  # Diccionario {ISBN: Libro} de libros prestados
 
     def __str__(self):
         return f"Usuario: {self.nombre} (ID: {self.user_id})"
 
 
-# Clase Biblioteca
-class Biblioteca:
+# Clase Prestamo
+class Prestamo:
+    def __init__(self, libro, user_id, fecha, vence):
+        self.libro = libro
+        self.user_id = user_id
+        self.fecha = fecha      # Momento del préstamo
+        self.vence = vence      # Fecha límite de devolución
+
+    def __str__(self):
+        return f"{self.libro} -> {self.user_id} (vence {self.vence:%Y-%m-%d})"
+
+
+# Índice invertido palabra -> ISBNs, con vocabulario ordenado para buscar por prefijo
+class IndiceTexto:
+    """
+    Índice invertido palabra -> ISBNs, con el vocabulario ordenado para buscar por prefijo.
+    Las palabras que aparecen o desaparecen se anotan aparte y el vocabulario se pone
+    al día en la siguiente búsqueda: unas pocas con insort, muchas (p. ej. tras una
+    carga masiva con agregar_varios) ordenando una sola vez.
+    """
+    MAX_PENDIENTES = 64  # Más cambios que esto: se reordena todo el vocabulario
+
+    def __init__(self):
+        self.postings = {}      # Diccionario {palabra: set de ISBN}
+        self.vocabulario = []   # Palabras ordenadas (bisect para prefijos)
+        self._nuevas = set()    # Palabras aún no insertadas en el vocabulario
+        self._quitadas = set()  # Palabras aún no borradas del vocabulario
+        self._reordenar = False  # True: el vocabulario se rehace entero desde `postings`
+
+    @staticmethod
+    def palabras(texto):
+        return set(re.findall(r"\w+", texto.lower()))
+
+    def agregar(self, isbn, texto):
+        for palabra in self.palabras(texto):
+            if palabra not in self.postings:
+                self.postings[palabra] = set()
+                if palabra in self._quitadas:
+                    self._quitadas.discard(palabra)  # sigue en el vocabulario
+                else:
+                    self._nuevas.add(palabra)
+            self.postings[palabra].add(isbn)
+
+    def agregar_varios(self, entradas):
+        """Carga masiva de pares (isbn, palabras ya normalizadas con `palabras`)."""
+        postings = self.postings
+        antes = len(postings)
+        for isbn, palabras in entradas:
+            for palabra in palabras:
+                isbns = postings.get(palabra)
+                if isbns is None:
+                    postings[palabra] = {isbn}
+                else:
+                    isbns.add(isbn)
+        if len(postings) != antes:
+            self._reordenar = True
+
+    def quitar(self, isbn, texto):
+        for palabra in self.palabras(texto):
+            isbns = self.postings.get(palabra)
+            if isbns is None:
+                continue
+            isbns.discard(isbn)
+            if not isbns:
+                del self.postings[palabra]
+                if palabra in self._nuevas:
+                    self._nuevas.discard(palabra)  # nunca llegó al vocabulario
+                else:
+                    self._quitadas.add(palabra)
+
+    def _ordenar(self):
+        if self._reordenar or len(self._nuevas) + len(self._quitadas) > self.MAX_PENDIENTES:
+            self.vocabulario = sorted(self.postings)
+            self._reordenar = False
+        else:
+            for palabra in self._quitadas:
+                del self.vocabulario[bisect_left(self.vocabulario, palabra)]
+            for palabra in self._nuevas:
+                insort(self.vocabulario, palabra)
+        self._nuevas.clear()
+        self._quitadas.clear()
+
+    def buscar_prefijo(self, prefijo):
+        """ISBNs con alguna palabra que empieza por `prefijo`."""
+        if self._reordenar or self._nuevas or self._quitadas:
+            self._ordenar()
+        resultado = set()
+        i = bisect_left(self.vocabulario, prefijo)
+        while i < len(self.vocabulario) and self.vocabulario[i].startswith(prefijo):
+            resultado |= self.postings[self.vocabulario[i]]
+            i += 1
+        return resultado
+
+    def buscar(self, consulta):
+        """ISBNs que contienen todas las palabras de la consulta (cada una como prefijo)."""
+        palabras = self.palabras(consulta)
+        if not palabras:
+            return None  # consulta vacía: no restringe
+        conjuntos = sorted((self.buscar_prefijo(p) for p in palabras), key=len)
+        resultado = conjuntos[0]
+        for c in conjuntos[1:]:
+            resultado &= c
+        return resultado
+
+
+# ==============================
+# Importación masiva (se ejecuta en procesos hijos: función de módulo)
+# ==============================
+@contextmanager
+def _sin_recolector():
+    """
+    Pausa el recolector de ciclos durante una carga masiva: se crean cientos de miles
+    de objetos que viven para siempre y cada pasada completa recorrería todo el catálogo.
+    """
+    activo = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if activo:
+            gc.enable()
+
+
+def _bloques(f, formato):
+    """
+    Lee el archivo de a LINEAS_POR_BLOQUE líneas. En CSV el corte se corre hasta el
+    final del registro: mientras las comillas del bloque sean impares, la última
+    línea está dentro de un campo entre comillas con saltos de línea y se siguen
+    sumando líneas (como mucho otro bloque, por si es una comilla sin cerrar).
+    """
+    while True:
+        lineas = list(islice(f, LINEAS_POR_BLOQUE))
+        if not lineas:
+            return
+        if formato == "csv" and "".join(lineas).count('"') % 2:
+            for linea in islice(f, LINEAS_POR_BLOQUE):
+                lineas.append(linea)
+                if linea.count('"') % 2:  # cierra el campo abierto
+                    break
+        yield lineas
+
+
+def _registros_csv(lineas, primera, errores):
+    """(número de la línea donde empieza, registro) de cada registro CSV del bloque."""
+    lector = csv.reader(lineas)
+    siguiente = primera
+    try:
+        for registro in lector:
+            yield siguiente, registro
+            siguiente = primera + lector.line_num
+    except csv.Error as e:
+        # Una comilla sin cerrar hace crecer el campo hasta el límite de csv
+        errores.append((siguiente, f"CSV mal formado ({e}); se omitieron las líneas "
+                                   f"{siguiente} a {primera + len(lineas) - 1}"))
+
+
+def _parsear_bloque(formato, campos, lineas, primera):
+    """
+    Convierte un bloque de líneas CSV/JSONL en tuplas (titulo, autor, categoria, isbn).
+    Retorna (filas válidas, palabras de título y autor de cada fila, [(número de línea, motivo)]).
+    Separar las palabras aquí aprovecha los procesos hijos; van unidas por espacios (una
+    cadena por campo se transfiere entre procesos mucho más rápido que un set).
+    """
+    filas, palabras, errores = [], [], []
+    if formato == "csv":
+        registros = _registros_csv(lineas, primera, errores)
+    else:
+        registros = enumerate(lineas, primera)
+    for numero, registro in registros:
+        try:
+            if formato == "csv":
+                if not registro:
+                    continue  # línea en blanco
+                if len(registro) != len(campos):
+                    raise ValueError(f"se esperaban {len(campos)} columnas y hay {len(registro)}")
+                datos = dict(zip(campos, registro))
+            else:
+                if not registro.strip():
+                    continue
+                datos = json.loads(registro)
+                if not isinstance(datos, dict):
+                    raise ValueError("se esperaba un objeto JSON")
+            fila = tuple(str(datos.get(c) or "").strip() for c in CAMPOS_LIBRO)
+            faltan = [c for c, v in zip(CAMPOS_LIBRO, fila) if not v]
+            if faltan:
+                raise ValueError("faltan campos: " + ", ".join(faltan))
+            filas.append(fila)
+            palabras.append((" ".join(IndiceTexto.palabras(fila[0])), " ".join(IndiceTexto.palabras(fila[1]))))
+        except ValueError as e:  # json.JSONDecodeError también es ValueError
+            errores.append((numero, str(e)))
+    return filas, palabras, errores
+
+
+# ==============================
+# Repositorios (almacenamiento intercambiable de la Biblioteca)
+# ==============================
+
+# Repositorio en memoria: diccionarios e índices, se pierde al cerrar el programa
+class RepositorioMemoria:
     def __init__(self):
-        self.libros = {}        # Diccionario {ISBN: Libro}
+        self.libros = {}        # Diccionario {ISBN: Libro} de libros disponibles
         self.usuarios = {}      # Diccionario {ID: Usuario}
         self.ids_usuarios = set()  # Conjunto para IDs únicos
+        # Índices secundarios sobre los libros disponibles
+        self.indice_titulo = IndiceTexto()
+        self.indice_autor = IndiceTexto()
+        self.por_categoria = {}  # Diccionario {categoría en minúsculas: set de ISBN}
+        # Diccionario {ISBN: secuencia} para devolver resultados en orden de alta; se conserva
+        # mientras el libro está prestado, así vuelve a su lugar (como el rowid de SQLite)
+        self.orden = {}
+        self.secuencia = 0
+        self.libros_en_orden = True  # False si un libro devuelto quedó al final de `libros`
+        # Préstamos activos y montículo de vencimientos (fecha, secuencia, Prestamo)
+        self.prestamos = {}      # Diccionario {ISBN: Prestamo}
+        self.vencimientos = []
+        self.secuencia_prestamos = 0
+
+    # ----- Libros -----
+    def agregar_libro(self, libro):
+        if libro.isbn in self.libros or libro.isbn in self.prestamos:
+            return False
+        self.libros[libro.isbn] = libro
+        self._indexar(libro)
+        return True
+
+    def agregar_libros(self, libros, palabras=None):
+        """
+        Agrega varios libros; retorna cuántos eran nuevos. `palabras` (opcional) trae las
+        palabras de título y autor de cada libro unidas por espacios, como las da _parsear_bloque.
+        Los índices de texto se cargan de una vez y el vocabulario se ordena una sola vez.
+        """
+        with _sin_recolector():
+            titulos, autores = [], []
+            for k, libro in enumerate(libros):
+                isbn = libro.isbn
+                if isbn in self.libros or isbn in self.prestamos:
+                    continue
+                self.libros[isbn] = libro
+                self.por_categoria.setdefault(libro.categoria.lower(), set()).add(isbn)
+                self.orden[isbn] = self.secuencia
+                self.secuencia += 1
+                if palabras is None:
+                    titulos.append((isbn, IndiceTexto.palabras(libro.info[0])))
+                    autores.append((isbn, IndiceTexto.palabras(libro.info[1])))
+                else:
+                    titulos.append((isbn, palabras[k][0].split()))
+                    autores.append((isbn, palabras[k][1].split()))
+            self.indice_titulo.agregar_varios(titulos)
+            self.indice_autor.agregar_varios(autores)
+        return len(titulos)
+
+    def quitar_libro(self, isbn):
+        libro = self.libros.pop(isbn, None)
+        if libro is not None:
+            self._desindexar(libro)
+            del self.orden[isbn]
+        return libro
+
+    def obtener_libro(self, isbn):
+        return self.libros.get(isbn)
+
+    # ----- Usuarios -----
+    def registrar_usuario(self, usuario):
+        if usuario.user_id in self.ids_usuarios:
+            return False
+        self.usuarios[usuario.user_id] = usuario
+        self.ids_usuarios.add(usuario.user_id)
+        return True
+
+    def quitar_usuario(self, user_id):
+        """Da de baja al usuario; sus libros prestados vuelven al catálogo."""
+        usuario = self.usuarios.get(user_id)
+        if usuario is not None:
+            for isbn in list(usuario.libros_prestados):
+                self.cerrar_prestamo(self.prestamos[isbn])
+            del self.usuarios[user_id]
+            self.ids_usuarios.remove(user_id)
+        return usuario
+
+    def obtener_usuario(self, user_id):
+        return self.usuarios.get(user_id)
+
+    # ----- Préstamos -----
+    def registrar_prestamo(self, prestamo):
+        libro = self.libros.pop(prestamo.libro.isbn)  # Se quita del catálogo disponible
+        self._desindexar(libro)
+        self.usuarios[prestamo.user_id].libros_prestados[libro.isbn] = libro
+        self.prestamos[libro.isbn] = prestamo
+        heapq.heappush(self.vencimientos, (prestamo.vence, self.secuencia_prestamos, prestamo))
+        self.secuencia_prestamos += 1
+
+    def cerrar_prestamo(self, prestamo):
+        # La entrada del montículo queda obsoleta y se descarta más adelante
+        isbn = prestamo.libro.isbn
+        del self.prestamos[isbn]
+        libro = self.usuarios[prestamo.user_id].libros_prestados.pop(isbn)
+        self.libros[isbn] = libro
+        self.libros_en_orden = False
+        self._indexar(libro)
+        self._limpiar_vencimientos()
+        return libro
+
+    def obtener_prestamo(self, isbn):
+        return self.prestamos.get(isbn)
+
+    def prestamos_vencidos(self, ahora):
+        # Recorre el montículo solo por las ramas vencidas: O(k log k), sin revisar todos los préstamos
+        vencidos = []
+        pendientes = [0] if self.vencimientos else []
+        while pendientes:
+            i = pendientes.pop()
+            vence, _, prestamo = self.vencimientos[i]
+            if vence >= ahora:
+                continue  # sus hijos vencen aún más tarde
+            if self.prestamos.get(prestamo.libro.isbn) is prestamo:
+                vencidos.append(self.vencimientos[i])
+            pendientes.extend(h for h in (2 * i + 1, 2 * i + 2) if h < len(self.vencimientos))
+        return [prestamo for _, _, prestamo in sorted(vencidos)]
+
+    def _limpiar_vencimientos(self):
+        # Descarta entradas de préstamos ya devueltos: las del tope en O(log n), y si se
+        # acumulan demasiadas en el resto del montículo, se reconstruye
+        while self.vencimientos and self.prestamos.get(self.vencimientos[0][2].libro.isbn) is not self.vencimientos[0][2]:
+            heapq.heappop(self.vencimientos)
+        if len(self.vencimientos) > 2 * len(self.prestamos) + 16:
+            self.vencimientos = [e for e in self.vencimientos if self.prestamos.get(e[2].libro.isbn) is e[2]]
+            heapq.heapify(self.vencimientos)
+
+    # ----- Índices -----
+    def _indexar(self, libro):
+        self.indice_titulo.agregar(libro.isbn, libro.info[0])
+        self.indice_autor.agregar(libro.isbn, libro.info[1])
+        self.por_categoria.setdefault(libro.categoria.lower(), set()).add(libro.isbn)
+        if libro.isbn not in self.orden:
+            self.orden[libro.isbn] = self.secuencia
+            self.secuencia += 1
+
+    def _desindexar(self, libro):
+        self.indice_titulo.quitar(libro.isbn, libro.info[0])
+        self.indice_autor.quitar(libro.isbn, libro.info[1])
+        categoria = libro.categoria.lower()
+        self.por_categoria[categoria].discard(libro.isbn)
+        if not self.por_categoria[categoria]:
+            del self.por_categoria[categoria]
+
+    # ----- Búsqueda -----
+    def buscar(self, titulo=None, autor=None, categoria=None):
+        conjuntos = []
+        if titulo is not None:
+            conjuntos.append(self.indice_titulo.buscar(titulo))
+        if autor is not None:
+            conjuntos.append(self.indice_autor.buscar(autor))
+        if categoria is not None:
+            conjuntos.append(self.por_categoria.get(categoria.strip().lower(), set()))
+        conjuntos = [c for c in conjuntos if c is not None]
+        if not conjuntos:
+            if not self.libros_en_orden:
+                # Casi ordenado (solo los devueltos están fuera de lugar): sort es casi lineal
+                self.libros = {i: self.libros[i] for i in sorted(self.libros, key=self.orden.__getitem__)}
+                self.libros_en_orden = True
+            return list(self.libros.values())
+        conjuntos.sort(key=len)
+        isbns = set(conjuntos[0])
+        for c in conjuntos[1:]:
+            isbns &= c
+        return [self.libros[i] for i in sorted(isbns, key=self.orden.__getitem__)]
+
+    def cerrar(self):
+        pass
+
+
+# Repositorio SQLite: el catálogo vive en disco y se consulta bajo demanda,
+# así el arranque no depende del tamaño del catálogo y la memoria no crece con él.
+# Las consultas son textos constantes con parámetros "?": sqlite3 guarda en caché
+# la sentencia preparada de cada una y la reutiliza en cada llamada.
+class RepositorioSQLite:
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS libros (
+            isbn TEXT PRIMARY KEY,
+            titulo TEXT NOT NULL,
+            autor TEXT NOT NULL,
+            categoria TEXT NOT NULL,
+            clave_categoria TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_libros_categoria ON libros(clave_categoria);
+        -- Palabras de título ('t') y autor ('a') para buscar por prefijo con el índice
+        CREATE TABLE IF NOT EXISTS palabras (
+            campo TEXT NOT NULL,
+            palabra TEXT NOT NULL,
+            isbn TEXT NOT NULL,
+            PRIMARY KEY (campo, palabra, isbn)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_palabras_isbn ON palabras(isbn);
+        CREATE TABLE IF NOT EXISTS usuarios (
+            user_id TEXT PRIMARY KEY,
+            nombre TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS prestamos (
+            isbn TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            fecha REAL NOT NULL,
+            vence REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_prestamos_usuario ON prestamos(user_id);
+        CREATE INDEX IF NOT EXISTS idx_prestamos_vence ON prestamos(vence);
+    """
+    FIN_PREFIJO = "\U0010ffff"  # Mayor que cualquier carácter: palabra >= p AND palabra < p + FIN
+
+    def __init__(self, ruta="biblioteca.db"):
+        self.conexion = sqlite3.connect(ruta)
+        self.conexion.execute("PRAGMA journal_mode=WAL")
+        self.conexion.execute("PRAGMA synchronous=NORMAL")
+        self.conexion.executescript(self.ESQUEMA)
+
+    @staticmethod
+    def _libro(fila):
+        isbn, titulo, autor, categoria = fila
+        return Libro(titulo, autor, categoria, isbn)
+
+    def _prestamo(self, fila):
+        isbn, titulo, autor, categoria, user_id, fecha, vence = fila
+        return Prestamo(Libro(titulo, autor, categoria, isbn), user_id,
+                        datetime.fromtimestamp(fecha), datetime.fromtimestamp(vence))
+
+    # ----- Libros -----
+    def agregar_libro(self, libro):
+        return self.agregar_libros([libro]) == 1
+
+    def agregar_libros(self, libros, palabras=None):
+        """
+        Agrega varios libros en una sola transacción; retorna cuántos eran nuevos.
+        `palabras` (opcional): palabras de título y autor de cada libro unidas por espacios.
+        """
+        nuevos = 0
+        filas_palabras = []
+        with self.conexion:
+            cursor = self.conexion.cursor()
+            for k, libro in enumerate(libros):
+                titulo, autor = libro.info
+                cursor.execute(
+                    "INSERT OR IGNORE INTO libros VALUES (?, ?, ?, ?, ?)",
+                    (libro.isbn, titulo, autor, libro.categoria, libro.categoria.lower()))
+                if cursor.rowcount:
+                    nuevos += 1
+                    if palabras is None:
+                        de_titulo, de_autor = IndiceTexto.palabras(titulo), IndiceTexto.palabras(autor)
+                    else:
+                        de_titulo, de_autor = palabras[k][0].split(), palabras[k][1].split()
+                    filas_palabras.extend(("t", p, libro.isbn) for p in de_titulo)
+                    filas_palabras.extend(("a", p, libro.isbn) for p in de_autor)
+            cursor.executemany("INSERT OR IGNORE INTO palabras VALUES (?, ?, ?)", filas_palabras)
+        return nuevos
+
+    def quitar_libro(self, isbn):
+        libro = self.obtener_libro(isbn)
+        if libro is not None:
+            with self.conexion:
+                self.conexion.execute("DELETE FROM palabras WHERE isbn = ?", (isbn,))
+                self.conexion.execute("DELETE FROM libros WHERE isbn = ?", (isbn,))
+        return libro
+
+    def obtener_libro(self, isbn):
+        """Libro disponible (no prestado) con ese ISBN, o None."""
+        fila = self.conexion.execute(
+            "SELECT isbn, titulo, autor, categoria FROM libros l WHERE isbn = ?"
+            " AND NOT EXISTS (SELECT 1 FROM prestamos p WHERE p.isbn = l.isbn)", (isbn,)).fetchone()
+        return None if fila is None else self._libro(fila)
+
+    # ----- Usuarios -----
+    def registrar_usuario(self, usuario):
+        with self.conexion:
+            cursor = self.conexion.execute(
+                "INSERT OR IGNORE INTO usuarios VALUES (?, ?)", (usuario.user_id, usuario.nombre))
+        return cursor.rowcount == 1
+
+    def quitar_usuario(self, user_id):
+        usuario = self.obtener_usuario(user_id)
+        if usuario is not None:
+            with self.conexion:
+                self.conexion.execute("DELETE FROM prestamos WHERE user_id = ?", (user_id,))
+                self.conexion.execute("DELETE FROM usuarios WHERE user_id = ?", (user_id,))
+        return usuario
+
+    def obtener_usuario(self, user_id):
+        fila = self.conexion.execute(
+            "SELECT nombre FROM usuarios WHERE user_id = ?", (user_id,)).fetchone()
+        if fila is None:
+            return None
+        usuario = Usuario(fila[0], user_id)
+        for libro in map(self._libro, self.conexion.execute(
+                "SELECT l.isbn, l.titulo, l.autor, l.categoria FROM prestamos p"
+                " JOIN libros l ON l.isbn = p.isbn WHERE p.user_id = ? ORDER BY p.fecha", (user_id,))):
+            usuario.libros_prestados[libro.isbn] = libro
+        return usuario
+
+    # ----- Préstamos -----
+    def registrar_prestamo(self, prestamo):
+        with self.conexion:
+            self.conexion.execute(
+                "INSERT INTO prestamos VALUES (?, ?, ?, ?)",
+                (prestamo.libro.isbn, prestamo.user_id,
+                 prestamo.fecha.timestamp(), prestamo.vence.timestamp()))
+
+    def cerrar_prestamo(self, prestamo):
+        with self.conexion:
+            self.conexion.execute("DELETE FROM prestamos WHERE isbn = ?", (prestamo.libro.isbn,))
+        return prestamo.libro
+
+    def obtener_prestamo(self, isbn):
+        fila = self.conexion.execute(
+            "SELECT l.isbn, l.titulo, l.autor, l.categoria, p.user_id, p.fecha, p.vence"
+            " FROM prestamos p JOIN libros l ON l.isbn = p.isbn WHERE p.isbn = ?", (isbn,)).fetchone()
+        return None if fila is None else self._prestamo(fila)
+
+    def prestamos_vencidos(self, ahora):
+        return [self._prestamo(fila) for fila in self.conexion.execute(
+            "SELECT l.isbn, l.titulo, l.autor, l.categoria, p.user_id, p.fecha, p.vence"
+            " FROM prestamos p JOIN libros l ON l.isbn = p.isbn"
+            " WHERE p.vence < ? ORDER BY p.vence", (ahora.timestamp(),))]
+
+    # ----- Búsqueda -----
+    def buscar(self, titulo=None, autor=None, categoria=None):
+        condiciones = ["NOT EXISTS (SELECT 1 FROM prestamos p WHERE p.isbn = l.isbn)"]
+        parametros = []
+        for campo, consulta in (("t", titulo), ("a", autor)):
+            for palabra in sorted(IndiceTexto.palabras(consulta or "")):
+                condiciones.append("l.isbn IN (SELECT isbn FROM palabras"
+                                   " WHERE campo = ? AND palabra >= ? AND palabra < ?)")
+                parametros += [campo, palabra, palabra + self.FIN_PREFIJO]
+        if categoria is not None:
+            condiciones.append("l.clave_categoria = ?")
+            parametros.append(categoria.strip().lower())
+        sql = ("SELECT l.isbn, l.titulo, l.autor, l.categoria FROM libros l WHERE "
+               + " AND ".join(condiciones) + " ORDER BY l.rowid")
+        return [self._libro(fila) for fila in self.conexion.execute(sql, parametros)]
+
+    def cerrar(self):
+        self.conexion.close()
+
+
+# Clase Biblioteca
+class Biblioteca:
+    def __init__(self, repositorio=None):
+        # Almacenamiento intercambiable: en memoria por defecto, o RepositorioSQLite(ruta)
+        self.repositorio = repositorio if repositorio is not None else RepositorioMemoria()
+        self.suscriptores = []  # Funciones que reciben cada Evento; sin suscriptores no se muestra nada
+
+    # ----- Eventos -----
+    def suscribir(self, suscriptor):
+        self.suscriptores.append(suscriptor)
+
+    def desuscribir(self, suscriptor):
+        self.suscriptores.remove(suscriptor)
+
+    def _emitir(self, tipo, **datos):
+        if self.suscriptores:
+            evento = Evento(tipo, **datos)
+            for suscriptor in self.suscriptores:
+                suscriptor(evento)
 
     # ----- Gestión de libros -----
     def agregar_libro(self, libro):
-        if libro.isbn in self.libros:
-            print(f"❌ El libro con ISBN {libro.isbn} ya existe.")
-        else:
-            self.libros[libro.isbn] = libro
-            print(f"✅ Libro agregado: {libro}")
+        """Retorna True si el libro se agregó."""
+        if self.repositorio.agregar_libro(libro):
+            self._emitir(TipoEvento.LIBRO_AGREGADO, libro=libro)
+            return True
+        self._emitir(TipoEvento.LIBRO_EXISTENTE, isbn=libro.isbn)
+        return False
 
     def quitar_libro(self, isbn):
-        if isbn in self.libros:
-            eliminado = self.libros.pop(isbn)
-            print(f"🗑️ Libro eliminado: {eliminado}")
+        """Retorna el libro eliminado, o None."""
+        eliminado = self.repositorio.quitar_libro(isbn)
+        if eliminado is not None:
+            self._emitir(TipoEvento.LIBRO_ELIMINADO, libro=eliminado)
         else:
-            print(f"❌ No se encontró el libro con ISBN {isbn}")
+            self._emitir(TipoEvento.LIBRO_NO_ENCONTRADO, isbn=isbn)
+        return eliminado
 
     # ----- Gestión de usuarios -----
     def registrar_usuario(self, usuario):
-        if usuario.user_id in self.ids_usuarios:
-            print(f"❌ El usuario con ID {usuario.user_id} ya está registrado.")
-        else:
-            self.usuarios[usuario.user_id] = usuario
-            self.ids_usuarios.add(usuario.user_id)
-            print(f"✅ Usuario registrado: {usuario}")
+        """Retorna True si el usuario se registró."""
+        if self.repositorio.registrar_usuario(usuario):
+            self._emitir(TipoEvento.USUARIO_REGISTRADO, usuario=usuario)
+            return True
+        self._emitir(TipoEvento.USUARIO_EXISTENTE, user_id=usuario.user_id)
+        return False
 
     def dar_baja_usuario(self, user_id):
-        if user_id in self.usuarios:
-            eliminado = self.usuarios.pop(user_id)
-            self.ids_usuarios.remove(user_id)
-            print(f"🗑️ Usuario dado de baja: {eliminado}")
+        """Retorna el usuario dado de baja, o None."""
+        eliminado = self.repositorio.quitar_usuario(user_id)
+        if eliminado is not None:
+            self._emitir(TipoEvento.USUARIO_DADO_DE_BAJA, usuario=eliminado)
         else:
-            print(f"❌ No se encontró el usuario con ID {user_id}")
+            self._emitir(TipoEvento.USUARIO_NO_ENCONTRADO, user_id=user_id)
+        return eliminado
 
     # ----- Préstamos -----
-    def prestar_libro(self, user_id, isbn):
-        if user_id not in self.usuarios:
-            print("❌ Usuario no registrado.")
-            return
-        if isbn not in self.libros:
-            print("❌ Libro no disponible.")
-            return
+    def prestar_libro(self, user_id, isbn, dias=DIAS_PRESTAMO):
+        """Retorna el Prestamo registrado, o None si no se pudo prestar."""
+        usuario = self.repositorio.obtener_usuario(user_id)
+        if usuario is None:
+            self._emitir(TipoEvento.USUARIO_NO_REGISTRADO, user_id=user_id)
+            return None
+        libro = self.repositorio.obtener_libro(isbn)
+        if libro is None:
+            self._emitir(TipoEvento.LIBRO_NO_DISPONIBLE, isbn=isbn)
+            return None
 
-        usuario = self.usuarios[user_id]
-        libro = self.libros.pop(isbn)  # Se quita del catálogo disponible
-        usuario.libros_prestados.append(libro)
-        print(f"📚 Libro prestado: {libro} a {usuario.nombre}")
+        ahora = datetime.now()
+        prestamo = Prestamo(libro, user_id, ahora, ahora + timedelta(days=dias))
+        self.repositorio.registrar_prestamo(prestamo)
+        self._emitir(TipoEvento.LIBRO_PRESTADO, libro=libro, usuario=usuario, prestamo=prestamo)
+        return prestamo
 
     def devolver_libro(self, user_id, isbn):
-        if user_id not in self.usuarios:
-            print("❌ Usuario no registrado.")
-            return
+        """Retorna el libro devuelto, o None si el usuario no lo tenía."""
+        usuario = self.repositorio.obtener_usuario(user_id)
+        if usuario is None:
+            self._emitir(TipoEvento.USUARIO_NO_REGISTRADO, user_id=user_id)
+            return None
 
-        usuario = self.usuarios[user_id]
-        for libro in usuario.libros_prestados:
-            if libro.isbn == isbn:
-                usuario.libros_prestados.remove(libro)
-                self.libros[isbn] = libro
-                print(f"🔄 Libro devuelto: {libro} por {usuario.nombre}")
-                return
-        print(f"❌ El usuario {usuario.nombre} no tiene prestado el libro con ISBN {isbn}")
+        prestamo = self.repositorio.obtener_prestamo(isbn)
+        if prestamo is None or prestamo.user_id != user_id:
+            self._emitir(TipoEvento.DEVOLUCION_INVALIDA, usuario=usuario, isbn=isbn)
+            return None
+        libro = self.repositorio.cerrar_prestamo(prestamo)
+        self._emitir(TipoEvento.LIBRO_DEVUELTO, libro=libro, usuario=usuario)
+        return libro
+
+    def quien_tiene(self, isbn):
+        """Usuario que tiene prestado el libro, o None."""
+        prestamo = self.repositorio.obtener_prestamo(isbn)
+        return None if prestamo is None else self.repositorio.obtener_usuario(prestamo.user_id)
+
+    def prestamos_vencidos(self, ahora=None):
+        """Préstamos activos con fecha límite anterior a `ahora`, del más atrasado al menos."""
+        return self.repositorio.prestamos_vencidos(ahora or datetime.now())
+
+    # ----- Importación masiva -----
+    def importar(self, ruta, procesos=None):
+        """
+        Importa un catálogo CSV (con cabecera titulo,autor,categoria,isbn) o JSONL (.jsonl/.json).
+        El archivo se lee por bloques que se validan y separan en palabras en paralelo
+        (ProcessPoolExecutor) y se incorporan en orden, de a un bloque por vez, sin eventos
+        por libro. Ante ISBN repetidos gana la primera aparición. Retorna un resumen con los contadores y ejemplos de errores.
+        """
+        formato = "jsonl" if ruta.lower().endswith((".jsonl", ".json")) else "csv"
+        procesos = procesos or os.cpu_count() or 1
+        resumen = {"leidas": 0, "importados": 0, "duplicados": 0, "existentes": 0,
+                   "errores": 0, "ejemplos_error": []}
+        vistos = set()  # ISBN ya vistos en este archivo
+
+        def incorporar(filas, palabras, errores, n_lineas):
+            resumen["leidas"] += n_lineas
+            resumen["errores"] += len(errores)
+            resumen["ejemplos_error"].extend(errores[:MAX_EJEMPLOS_ERROR - len(resumen["ejemplos_error"])])
+            libros, palabras_libros = [], []
+            for (titulo, autor, categoria, isbn), de_libro in zip(filas, palabras):
+                if isbn in vistos:
+                    resumen["duplicados"] += 1
+                else:
+                    vistos.add(isbn)
+                    libros.append(Libro(titulo, autor, categoria, isbn))
+                    palabras_libros.append(de_libro)
+            nuevos = self.repositorio.agregar_libros(libros, palabras_libros)
+            resumen["importados"] += nuevos
+            resumen["existentes"] += len(libros) - nuevos
+
+        # utf-8-sig: Excel guarda los CSV con BOM, que si no quedaría pegado al primer campo
+        with open(ruta, encoding="utf-8-sig", newline="") as f, _sin_recolector():
+            campos, primera = None, 1
+            if formato == "csv":
+                cabecera = next(csv.reader([f.readline()]), [])
+                campos = [c.strip().lower() for c in cabecera]
+                if not set(CAMPOS_LIBRO) <= set(campos):
+                    raise ValueError(f"Cabecera CSV inválida: se requieren {', '.join(CAMPOS_LIBRO)}")
+                primera = 2
+            bloques = _bloques(f, formato)
+
+            if procesos <= 1:
+                for lineas in bloques:
+                    incorporar(*_parsear_bloque(formato, campos, lineas, primera), len(lineas))
+                    primera += len(lineas)
+            else:
+                with ProcessPoolExecutor(procesos) as ejecutor:
+                    # Ventana acotada de bloques en vuelo: memoria constante y orden de archivo
+                    pendientes = []
+                    for lineas in bloques:
+                        pendientes.append((ejecutor.submit(_parsear_bloque, formato, campos, lineas, primera),
+                                           len(lineas)))
+                        primera += len(lineas)
+                        if len(pendientes) >= 2 * procesos:
+                            futuro, n = pendientes.pop(0)
+                            incorporar(*futuro.result(), n)
+                    for futuro, n in pendientes:
+                        incorporar(*futuro.result(), n)
+
+        self._emitir(TipoEvento.CATALOGO_IMPORTADO, ruta=ruta, resumen=resumen)
+        return resumen
 
     # ----- Búsqueda -----
-    def buscar_libro(self, criterio, valor):
-        resultados = []
-        for libro in self.libros.values():
-            if (criterio == "titulo" and valor.lower() in libro.info[0].lower()) or \
-               (criterio == "autor" and valor.lower() in libro.info[1].lower()) or \
-               (criterio == "categoria" and valor.lower() in libro.categoria.lower()):
-                resultados.append(libro)
+    def buscar(self, titulo=None, autor=None, categoria=None):
+        """
+        Busca entre los libros disponibles combinando criterios (AND):
+        - titulo / autor: cada palabra de la consulta debe ser el inicio de una palabra
+        - categoria: coincidencia exacta (sin distinguir mayúsculas)
+        Retorna la lista de libros en orden de alta.
+        """
+        return self.repositorio.buscar(titulo, autor, categoria)
 
-        if resultados:
-            print(f"🔎 Resultados de búsqueda por {criterio}='{valor}':")
-            for libro in resultados:
-                print(f"   - {libro}")
-        else:
-            print(f"❌ No se encontraron libros para {criterio}='{valor}'")
+    def buscar_libro(self, criterio, valor):
+        """Libros disponibles cuyo `criterio` ("titulo", "autor" o "categoria") coincide con `valor`."""
+        if criterio in ("titulo", "autor", "categoria"):
+            return self.buscar(**{criterio: valor})
+        return []
 
     # ----- Listar libros prestados -----
     def listar_libros_prestados(self, user_id):
-        if user_id not in self.usuarios:
-            print("❌ Usuario no registrado.")
-            return
-        usuario = self.usuarios[user_id]
-        if usuario.libros_prestados:
-            print(f"📖 Libros prestados a {usuario.nombre}:")
-            for libro in usuario.libros_prestados:
-                print(f"   - {libro}")
-        else:
-            print(f"ℹ️ El usuario {usuario.nombre} no tiene libros prestados.")
+        """Libros que tiene prestados el usuario, o None si no está registrado."""
+        usuario = self.repositorio.obtener_usuario(user_id)
+        if usuario is None:
+            return None
+        return list(usuario.libros_prestados.values())
+
+    def cerrar(self):
+        self.repositorio.cerrar()
 
 
 # ==============================
 # PRUEBAS DEL SISTEMA
 # ==============================
 if __name__ == "__main__":
-    # Crear biblioteca
-    biblio = Biblioteca()
+    # Crear biblioteca: en memoria, o persistente con  python "Semana 12.py" biblioteca.db
+    biblio = Biblioteca(RepositorioSQLite(sys.argv[1]) if len(sys.argv) > 1 else None)
+    biblio.suscribir(mostrar_en_consola)
+
+    # Importar un catálogo:  python "Semana 12.py" biblioteca.db catalogo.csv
+    if len(sys.argv) > 2:
+        biblio.importar(sys.argv[2])
 
     # Agregar libros
     libro1 = Libro("Cien Años de Soledad", "Gabriel García Márquez", "Novela", "ISBN001")
@@ -150,12 +917,34 @@ if __name__ == "__main__":
     biblio.prestar_libro("U002", "ISBN002")
 
     # Listar libros prestados
-    biblio.listar_libros_prestados("U001")
-    biblio.listar_libros_prestados("U002")
+    for usuario in (usuario1, usuario2):
+        prestados = biblio.listar_libros_prestados(usuario.user_id)
+        if prestados is None:
+            print("❌ Usuario no registrado.")
+        elif prestados:
+            print(f"📖 Libros prestados a {usuario.nombre}:")
+            for libro in prestados:
+                print(f"   - {libro}")
+        else:
+            print(f"ℹ️ El usuario {usuario.nombre} no tiene libros prestados.")
 
     # Buscar libros
-    biblio.buscar_libro("titulo", "Python")
-    biblio.buscar_libro("autor", "Cervantes")
+    for criterio, valor in (("titulo", "Python"), ("autor", "Cervantes")):
+        resultados = biblio.buscar_libro(criterio, valor)
+        if resultados:
+            print(f"🔎 Resultados de búsqueda por {criterio}='{valor}':")
+            for libro in resultados:
+                print(f"   - {libro}")
+        else:
+            print(f"❌ No se encontraron libros para {criterio}='{valor}'")
+    # Búsqueda combinada (autor Y categoría): retorna la lista de libros
+    for libro in biblio.buscar(autor="raúl", categoria="programación"):
+        print(f"🔎 {libro}")
+
+    # Consultar préstamos
+    print(f"👤 ISBN002 lo tiene: {biblio.quien_tiene('ISBN002')}")
+    for prestamo in biblio.prestamos_vencidos(datetime.now() + timedelta(days=30)):
+        print(f"⏰ Vencido en 30 días: {prestamo}")
 
     # Devolver libros
     biblio.devolver_libro("U001", "ISBN001")
@@ -165,3 +954,5 @@ if __name__ == "__main__":
 
     # Quitar libro
     biblio.quitar_libro("ISBN003")
+
+    biblio.cerrar()
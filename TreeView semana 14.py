@@ -2,35 +2,157 @@
 Agenda Personal con Tkinter
 Archivo: agenda_simple.py
 
-Aplicación de agenda personal que permite agregar, ver y eliminar eventos.
+Aplicación de agenda personal que permite agregar, ver y eliminar eventos,
+y filtrarlos por fecha (hoy, esta semana, un rango) o por texto de la descripción.
+Los eventos que se repiten (diaria, semanal o mensualmente hasta una fecha) se guardan
+una sola vez como regla y sus ocurrencias se generan solo para el rango que se muestra
+(sin rango, los próximos HORIZONTE_REGLAS_DIAS días).
 No utiliza tkcalendar. La fecha se selecciona con Combobox (día, mes, año).
-Los datos se guardan en un archivo JSON.
+Los datos se guardan en un archivo JSON (instantánea) más un diario de cambios
+que se compacta en la instantánea cada cierto número de registros.
 """
 
 import tkinter as tk
 from tkinter import ttk, messagebox
+import calendar
+import heapq
 import json
 import os
-from datetime import datetime
+import re
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from itertools import islice
 
 DATA_FILE = "eventos.json"
+LOG_FILE = DATA_FILE + ".log"   # Diario: una línea JSON por acción (alta, regla o baja)
+UMBRAL_COMPACTACION = 500       # Registros del diario antes de volcar una instantánea nueva
+REPETICIONES = ("diaria", "semanal", "mensual")
+HORIZONTE_REGLAS_DIAS = 90      # Días de ocurrencias que se muestran si el filtro no fija el rango
+
+
+def clave_evento(evento):
+    """Fecha y hora del evento como datetime; se calcula una sola vez por evento."""
+    return datetime.strptime(evento["fecha"] + " " + evento["hora"], "%Y-%m-%d %H:%M")
+
+
+def palabras_de(texto):
+    return set(re.findall(r"\w+", texto.lower()))
+
+
+def coincide_texto(descripcion, texto):
+    """True si cada palabra de `texto` es el inicio de alguna palabra de la descripción."""
+    palabras = palabras_de(descripcion)
+    return all(any(p.startswith(q) for p in palabras) for q in palabras_de(texto))
+
+
+def ocurrencias(regla, desde=None, hasta=None):
+    """
+    Genera en orden los datetime de una regla de repetición dentro de [desde, hasta).
+    Salta directamente a la primera ocurrencia >= desde, sin recorrer las anteriores.
+    En la repetición mensual, los meses sin ese día usan el último día del mes.
+    """
+    inicio = clave_evento(regla)
+    fin = datetime.strptime(regla["hasta"], "%Y-%m-%d") + timedelta(days=1)  # "hasta" incluye ese día
+    if hasta is not None:
+        fin = min(fin, hasta)
+    if regla["repetir"] == "mensual":
+        k = 0
+        if desde is not None and desde > inicio:
+            k = max(0, (desde.year - inicio.year) * 12 + desde.month - inicio.month - 1)
+        while True:
+            anio, mes = divmod(inicio.month - 1 + k, 12)
+            anio, mes = inicio.year + anio, mes + 1
+            momento = inicio.replace(year=anio, month=mes,
+                                     day=min(inicio.day, calendar.monthrange(anio, mes)[1]))
+            if momento >= fin:
+                return
+            if desde is None or momento >= desde:
+                yield momento
+            k += 1
+    else:
+        paso = timedelta(days=1 if regla["repetir"] == "diaria" else 7)
+        momento = inicio
+        if desde is not None and desde > inicio:
+            momento += -((inicio - desde) // paso) * paso  # primera ocurrencia >= desde
+        while momento < fin:
+            yield momento
+            momento += paso
+
+
+def rango_hoy():
+    """(desde, hasta) de hoy: desde las 00:00 hasta las 00:00 de mañana."""
+    hoy = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return hoy, hoy + timedelta(days=1)
+
+
+def rango_semana():
+    """(desde, hasta) de la semana actual, de lunes a domingo."""
+    lunes = rango_hoy()[0]
+    lunes -= timedelta(days=lunes.weekday())
+    return lunes, lunes + timedelta(days=7)
+
+
+def ventana_reglas(desde, hasta):
+    """
+    (desde, hasta) en que se expanden las reglas: el rango del filtro, completado con
+    HORIZONTE_REGLAS_DIAS si le falta un extremo (sin ninguno, a partir de hoy).
+    """
+    horizonte = timedelta(days=HORIZONTE_REGLAS_DIAS)
+    if desde is None and hasta is None:
+        desde = rango_hoy()[0]
+    if hasta is None:
+        hasta = desde + horizonte
+    elif desde is None:
+        desde = hasta - horizonte
+    return desde, hasta
 
 
 class AgendaApp(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("Agenda Personal")
-        self.geometry("750x450")
+        self.geometry("750x540")
         self.resizable(False, False)
 
-        self.eventos = []
+        self.eventos = {}   # {id: evento}
+        self.claves = {}    # {id: datetime del evento}
+        self.orden = []     # Lista ordenada de (datetime, id)
+        self.indice_palabras = {}  # {palabra de la descripción: set de ids}
+        self.vocabulario = []      # Palabras ordenadas, para buscar por prefijo
+        self.filtro = None  # (desde, hasta, texto) del filtro activo, o None
+        self.vista = None   # Lista ordenada de (datetime, id) filtrada; None = se muestran todos
+        self.reglas = {}    # {id: regla de repetición}; comparten la numeración de los eventos
+        self.ventana = None  # (desde, hasta) en que se muestran las ocurrencias de las reglas
+        self.cache_ocurrencias = {}  # {id de regla: ((desde, hasta), [datetime])}, solo el último rango
         self.next_id = 1
+        self.log = None        # Archivo del diario abierto para añadir
+        self.pendientes = 0    # Registros en el diario desde la última instantánea
         self.cargar_eventos()
 
         self.crear_interfaz()
-        self.actualizar_tabla()
+        self.mostrar_todos()
 
     def crear_interfaz(self):
+        # Filtros
+        frame_filtros = ttk.Frame(self, padding=(10, 10, 10, 0))
+        frame_filtros.pack(fill=tk.X)
+
+        ttk.Label(frame_filtros, text="Desde:").pack(side=tk.LEFT)
+        self.entry_desde = ttk.Entry(frame_filtros, width=11)
+        self.entry_desde.pack(side=tk.LEFT, padx=(2, 8))
+        ttk.Label(frame_filtros, text="Hasta:").pack(side=tk.LEFT)
+        self.entry_hasta = ttk.Entry(frame_filtros, width=11)
+        self.entry_hasta.pack(side=tk.LEFT, padx=(2, 8))
+        ttk.Label(frame_filtros, text="Texto:").pack(side=tk.LEFT)
+        self.entry_texto = ttk.Entry(frame_filtros, width=18)
+        self.entry_texto.pack(side=tk.LEFT, padx=(2, 8))
+        self.entry_texto.bind("<Return>", lambda e: self.filtrar())
+
+        ttk.Button(frame_filtros, text="Filtrar", command=self.filtrar).pack(side=tk.LEFT, padx=2)
+        ttk.Button(frame_filtros, text="Hoy", command=self.mostrar_hoy).pack(side=tk.LEFT, padx=2)
+        ttk.Button(frame_filtros, text="Esta semana", command=self.mostrar_semana).pack(side=tk.LEFT, padx=2)
+        ttk.Button(frame_filtros, text="Todos", command=self.mostrar_todos).pack(side=tk.LEFT, padx=2)
+
         # Tabla
         frame_tabla = ttk.Frame(self, padding=10)
         frame_tabla.pack(fill=tk.BOTH, expand=True)
@@ -80,13 +202,23 @@ class AgendaApp(tk.Tk):
         self.entry_desc = tk.Text(frame_inferior, width=60, height=3)
         self.entry_desc.grid(row=1, column=1, columnspan=7, padx=5, pady=5)
 
+        # Repetición
+        ttk.Label(frame_inferior, text="Repetir:").grid(row=2, column=0, padx=2, pady=5)
+        self.combo_repetir = ttk.Combobox(frame_inferior, values=("No",) + REPETICIONES, width=8, state="readonly")
+        self.combo_repetir.current(0)
+        self.combo_repetir.grid(row=2, column=1, columnspan=2, padx=2, pady=5, sticky="w")
+        ttk.Label(frame_inferior, text="Hasta (AAAA-MM-DD):").grid(row=2, column=3, columnspan=3, padx=2, pady=5)
+        self.entry_repetir_hasta = ttk.Entry(frame_inferior, width=12)
+        self.entry_repetir_hasta.grid(row=2, column=6, columnspan=2, padx=2, pady=5, sticky="w")
+
         # Botones
         frame_botones = ttk.Frame(frame_inferior)
-        frame_botones.grid(row=0, column=8, rowspan=2, padx=10, pady=5, sticky="ns")
+        frame_botones.grid(row=0, column=8, rowspan=3, padx=10, pady=5, sticky="ns")
 
-        ttk.Button(frame_botones, text="Agregar Evento", command=self.agregar_evento).pack(fill="x", pady=5)
-        ttk.Button(frame_botones, text="Eliminar Seleccionado", command=self.eliminar_evento).pack(fill="x", pady=5)
-        ttk.Button(frame_botones, text="Salir", command=self.salir).pack(fill="x", pady=5)
+        ttk.Button(frame_botones, text="Agregar Evento", command=self.agregar_evento).pack(fill="x", pady=3)
+        ttk.Button(frame_botones, text="Editar Repetición", command=self.editar_repeticion).pack(fill="x", pady=3)
+        ttk.Button(frame_botones, text="Eliminar Seleccionado", command=self.eliminar_evento).pack(fill="x", pady=3)
+        ttk.Button(frame_botones, text="Salir", command=self.salir).pack(fill="x", pady=3)
 
     def validar_hora(self, hora):
         try:
@@ -95,7 +227,8 @@ class AgendaApp(tk.Tk):
         except ValueError:
             return False
 
-    def agregar_evento(self):
+    def leer_formulario(self):
+        """Datos del formulario como dict (con "repetir" y "hasta" si se repite), o None si no son válidos."""
         dia = self.combo_dia.get()
         mes = self.combo_mes.get()
         anio = self.combo_anio.get()
@@ -106,17 +239,56 @@ class AgendaApp(tk.Tk):
 
         if not hora or not descripcion:
             messagebox.showwarning("Campos incompletos", "Debe ingresar la hora y la descripción.")
-            return
+            return None
 
         if not self.validar_hora(hora):
             messagebox.showerror("Hora inválida", "La hora debe estar en formato HH:MM.")
+            return None
+
+        datos = {"fecha": fecha, "hora": hora, "descripcion": descripcion}
+        try:
+            inicio = clave_evento(datos)
+        except ValueError:
+            messagebox.showerror("Fecha inválida", f"La fecha {fecha} no existe.")
+            return None
+
+        repetir = self.combo_repetir.get()
+        if repetir in REPETICIONES:
+            try:
+                hasta = self.leer_fecha(self.entry_repetir_hasta.get())
+            except ValueError:
+                hasta = None
+            if hasta is None or hasta.date() < inicio.date():
+                messagebox.showerror("Repetición inválida",
+                                     "Indique hasta qué fecha (AAAA-MM-DD, no anterior al evento) se repite.")
+                return None
+            datos.update(repetir=repetir, hasta=hasta.strftime("%Y-%m-%d"))
+        return datos
+
+    def agregar_evento(self):
+        datos = self.leer_formulario()
+        if datos is None:
             return
 
-        evento = {"id": self.next_id, "fecha": fecha, "hora": hora, "descripcion": descripcion}
-        self.eventos.append(evento)
-        self.next_id += 1
-        self.guardar_eventos()
-        self.actualizar_tabla()
+        if "repetir" in datos:
+            self.agregar_regla(dict(datos, id=self.next_id))
+        else:
+            evento = dict(datos, id=self.next_id)
+            posicion = self.indexar_evento(evento)
+            self.next_id += 1
+            self.registrar_cambio({"op": "alta", "evento": evento, "next_id": self.next_id})
+            # Solo se inserta la fila nueva, en su lugar según la fecha (si el filtro la deja ver)
+            visible = True
+            if self.vista is not None:
+                visible = self.coincide(evento["id"])
+                if visible:
+                    par = (self.claves[evento["id"]], evento["id"])
+                    posicion = bisect_left(self.vista, par)
+                    self.vista.insert(posicion, par)
+            if visible:
+                self.tree.insert("", posicion, iid=str(evento["id"]),
+                                 values=(evento["fecha"], evento["hora"], evento["descripcion"]))
+                self.tree.see(str(evento["id"]))
 
         # Reset
         self.entry_hora.delete(0, tk.END)
@@ -132,38 +304,342 @@ class AgendaApp(tk.Tk):
         if not messagebox.askyesno("Confirmar", "¿Está seguro de eliminar el evento seleccionado?"):
             return
 
-        for item in seleccionado:
-            id_evento = int(self.tree.item(item, "iid"))
-            self.eventos = [e for e in self.eventos if e["id"] != id_evento]
-
-        self.guardar_eventos()
+        # Las filas "id@fechahora" son ocurrencias: se elimina la regla completa
+        ids = {int(item.partition("@")[0]) for item in seleccionado}
+        reglas = {i for i in ids if i in self.reglas}
+        for id_evento in ids - reglas:
+            if self.vista is not None:
+                del self.vista[bisect_left(self.vista, (self.claves[id_evento], id_evento))]
+            self.desindexar_evento(id_evento)
+        self.tree.delete(*(str(i) for i in ids - reglas))
+        for id_regla in reglas:
+            self.ocultar_regla(id_regla)
+            del self.reglas[id_regla]
+            self.cache_ocurrencias.pop(id_regla, None)
+
+        # Una sola línea en el diario para toda la selección
+        self.registrar_cambio({"op": "baja", "ids": sorted(ids)})
+
+    # Reglas de repetición
+    def agregar_regla(self, regla):
+        self.reglas[regla["id"]] = regla
+        self.next_id = max(self.next_id, regla["id"] + 1)
+        self.registrar_cambio({"op": "regla", "regla": regla, "next_id": self.next_id})
+        self.mostrar_regla(regla["id"])
+
+    def editar_regla(self, id_regla, **cambios):
+        """Cambia campos de una regla (fecha, hora, descripcion, repetir, hasta) y descarta su caché."""
+        regla = dict(self.reglas[id_regla], **cambios)
+        list(islice(ocurrencias(regla), 1))  # valida fechas antes de aplicar el cambio
+        self.ocultar_regla(id_regla)
+        self.reglas[id_regla] = regla
+        self.cache_ocurrencias.pop(id_regla, None)
+        self.registrar_cambio({"op": "regla", "regla": regla, "next_id": self.next_id})
+        self.mostrar_regla(id_regla)
+
+    def editar_repeticion(self):
+        seleccionado = [i for i in self.tree.selection() if "@" in i]
+        if len(seleccionado) != 1:
+            messagebox.showinfo("Editar", "Seleccione una ocurrencia de un evento repetido.")
+            return
+        datos = self.leer_formulario()
+        if datos is None:
+            return
+        if "repetir" not in datos:
+            messagebox.showinfo("Editar", "Elija la repetición (diaria, semanal o mensual) y hasta cuándo.")
+            return
+        self.editar_regla(int(seleccionado[0].partition("@")[0]), **datos)
+
+    def ocurrencias_en(self, id_regla, desde, hasta):
+        """
+        Ocurrencias de la regla en [desde, hasta). Se guarda solo el último rango de cada
+        regla: alcanza para alta, baja y edición sobre la vista actual sin acumular rangos.
+        """
+        rango, momentos = self.cache_ocurrencias.get(id_regla, (None, None))
+        if rango != (desde, hasta):
+            momentos = list(ocurrencias(self.reglas[id_regla], desde, hasta))
+            self.cache_ocurrencias[id_regla] = ((desde, hasta), momentos)
+        return momentos
+
+    def filas_de_regla(self, id_regla):
+        """(datetime, id) de las ocurrencias de la regla que deja ver el filtro activo."""
+        texto = self.filtro[2] if self.filtro else ""
+        if texto.strip() and not coincide_texto(self.reglas[id_regla]["descripcion"], texto):
+            return []
+        return [(momento, id_regla) for momento in self.ocurrencias_en(id_regla, *self.ventana)]
+
+    def mostrar_regla(self, id_regla):
+        """Inserta solo las filas de la regla, cada una en su lugar según la fecha."""
+        if self.vista is None:
+            # Hasta ahora no había reglas: la tabla muestra todos los eventos simples
+            self.vista = list(self.orden)
+            self.ventana = ventana_reglas(None, None)
+        for par in self.filas_de_regla(id_regla):
+            posicion = bisect_left(self.vista, par)
+            self.vista.insert(posicion, par)
+            iid, valores = self.fila(*par)
+            self.tree.insert("", posicion, iid=iid, values=valores)
+
+    def ocultar_regla(self, id_regla):
+        """Quita de la vista y de la tabla solo las filas de la regla (antes de cambiarla)."""
+        if self.vista is None:
+            return
+        filas = self.filas_de_regla(id_regla)
+        if filas:
+            self.vista = [par for par in self.vista if par[1] != id_regla]
+            self.tree.delete(*(self.fila(*par)[0] for par in filas))
+
+    # Índice ordenado: cada alta o baja es una búsqueda binaria, sin reordenar todo
+    def indexar_evento(self, evento):
+        """Agrega el evento al índice y retorna su posición en la tabla."""
+        clave = clave_evento(evento)
+        self.eventos[evento["id"]] = evento
+        self.claves[evento["id"]] = clave
+        posicion = bisect_left(self.orden, (clave, evento["id"]))
+        self.orden.insert(posicion, (clave, evento["id"]))
+        self.indexar_palabras(evento)
+        return posicion
+
+    def desindexar_evento(self, id_evento):
+        evento = self.eventos.pop(id_evento)
+        clave = self.claves.pop(id_evento)
+        del self.orden[bisect_left(self.orden, (clave, id_evento))]
+        for palabra in palabras_de(evento["descripcion"]):
+            ids = self.indice_palabras[palabra]
+            ids.discard(id_evento)
+            if not ids:
+                del self.indice_palabras[palabra]
+                del self.vocabulario[bisect_left(self.vocabulario, palabra)]
+        return evento
+
+    def indexar_palabras(self, evento):
+        for palabra in palabras_de(evento["descripcion"]):
+            if palabra not in self.indice_palabras:
+                self.indice_palabras[palabra] = set()
+                insort(self.vocabulario, palabra)
+            self.indice_palabras[palabra].add(evento["id"])
+
+    # Consultas: rango de fechas por bisect sobre self.orden (O(log n + k)) y
+    # texto por el índice de palabras
+    def eventos_entre(self, desde, hasta):
+        """(datetime, id) de los eventos con desde <= fecha < hasta, en orden."""
+        inicio = bisect_left(self.orden, (desde,))
+        fin = bisect_left(self.orden, (hasta,))
+        return self.orden[inicio:fin]
+
+    def eventos_de_hoy(self):
+        return self.eventos_entre(*rango_hoy())
+
+    def eventos_de_la_semana(self):
+        return self.eventos_entre(*rango_semana())
+
+    def buscar_texto(self, texto):
+        """Ids cuya descripción tiene palabras que empiezan por cada palabra de `texto`."""
+        resultado = None
+        for consulta in palabras_de(texto):
+            ids = set()
+            i = bisect_left(self.vocabulario, consulta)
+            while i < len(self.vocabulario) and self.vocabulario[i].startswith(consulta):
+                ids |= self.indice_palabras[self.vocabulario[i]]
+                i += 1
+            resultado = ids if resultado is None else resultado & ids
+            if not resultado:
+                break
+        return resultado if resultado is not None else set()
+
+    def consultar(self, desde=None, hasta=None, texto=None):
+        """Eventos que cumplen todos los criterios dados, como lista ordenada de (datetime, id)."""
+        if texto and texto.strip():
+            ids = self.buscar_texto(texto)
+            if desde is None and hasta is None:
+                return sorted((self.claves[i], i) for i in ids)
+            rango = self.eventos_entre(desde or datetime.min, hasta or datetime.max)
+            if len(ids) < len(rango):
+                return sorted((self.claves[i], i) for i in ids
+                              if (desde is None or self.claves[i] >= desde)
+                              and (hasta is None or self.claves[i] < hasta))
+            return [par for par in rango if par[1] in ids]
+        return self.eventos_entre(desde or datetime.min, hasta or datetime.max)
+
+    def coincide(self, id_evento):
+        """True si el evento entra en el filtro activo."""
+        desde, hasta, texto = self.filtro or (None, None, "")
+        clave = self.claves[id_evento]
+        if (desde is not None and clave < desde) or (hasta is not None and clave >= hasta):
+            return False
+        return not texto.strip() or id_evento in self.buscar_texto(texto)
+
+    # Filtros de la interfaz
+    def aplicar_filtro(self, desde=None, hasta=None, texto=""):
+        self.filtro = (desde, hasta, texto)
+        self.armar_vista(self.consultar(desde, hasta, texto))
+
+    def armar_vista(self, eventos):
+        """Intercala por fecha `eventos` (simples) con las ocurrencias de las reglas y rehace la tabla."""
+        desde, hasta, _ = self.filtro or (None, None, "")
+        self.ventana = ventana_reglas(desde, hasta)
+        repetidos = [self.filas_de_regla(id_regla) for id_regla in self.reglas]
+        self.vista = list(heapq.merge(eventos, *repetidos))
         self.actualizar_tabla()
 
-    def actualizar_tabla(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+    def filtrar(self):
+        try:
+            desde = self.leer_fecha(self.entry_desde.get())
+            hasta = self.leer_fecha(self.entry_hasta.get())
+        except ValueError:
+            messagebox.showerror("Fecha inválida", "Las fechas deben tener el formato AAAA-MM-DD.")
+            return
+        if hasta is not None:
+            hasta += timedelta(days=1)  # "Hasta" incluye ese día completo
+        texto = self.entry_texto.get()
+        if desde is None and hasta is None and not texto.strip():
+            self.mostrar_todos()
+        else:
+            self.aplicar_filtro(desde, hasta, texto)
+
+    @staticmethod
+    def leer_fecha(texto):
+        texto = texto.strip()
+        return datetime.strptime(texto, "%Y-%m-%d") if texto else None
+
+    def mostrar_hoy(self):
+        self.aplicar_filtro(*rango_hoy())
+
+    def mostrar_semana(self):
+        self.aplicar_filtro(*rango_semana())
+
+    def mostrar_todos(self):
+        self.filtro = None
+        if self.reglas:
+            # Con reglas, "todos" son los eventos simples más las ocurrencias de los
+            # próximos HORIZONTE_REGLAS_DIAS días (no cada regla hasta su fecha final)
+            self.armar_vista(self.orden)
+        else:
+            self.vista = None
+            self.actualizar_tabla()
+
+    def fila(self, momento, id_evento):
+        """(iid, valores) de la fila de la tabla para un evento o una ocurrencia de regla."""
+        regla = self.reglas.get(id_evento)
+        if regla is not None:
+            return (f"{id_evento}@{momento:%Y%m%d%H%M}",
+                    (momento.strftime("%Y-%m-%d"), regla["hora"], f"{regla['descripcion']} ({regla['repetir']})"))
+        ev = self.eventos[id_evento]
+        return str(id_evento), (ev["fecha"], ev["hora"], ev["descripcion"])
 
-        eventos_ordenados = sorted(
-            self.eventos,
-            key=lambda e: datetime.strptime(e["fecha"] + " " + e["hora"], "%Y-%m-%d %H:%M")
-        )
-        for ev in eventos_ordenados:
-            self.tree.insert("", tk.END, iid=str(ev["id"]), values=(ev["fecha"], ev["hora"], ev["descripcion"]))
+    def actualizar_tabla(self):
+        self.tree.delete(*self.tree.get_children())
+        for momento, id_evento in (self.orden if self.vista is None else self.vista):
+            iid, valores = self.fila(momento, id_evento)
+            self.tree.insert("", tk.END, iid=iid, values=valores)
+
+    # Persistencia: cada acción añade una línea al diario (con fsync) en lugar de
+    # reescribir eventos.json; al llegar a UMBRAL_COMPACTACION se compacta.
+    def registrar_cambio(self, registro):
+        try:
+            if self.log is None:
+                self.log = open(LOG_FILE, "a", encoding="utf-8")
+            self.log.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            self.log.flush()
+            os.fsync(self.log.fileno())
+        except OSError as e:
+            messagebox.showerror("Error al guardar", f"No se pudo guardar el cambio: {e}")
+            return
+        self.pendientes += 1
+        if self.pendientes >= UMBRAL_COMPACTACION:
+            self.compactar()
 
     def guardar_eventos(self):
-        with open(DATA_FILE, "w", encoding="utf-8") as f:
-            json.dump({"next_id": self.next_id, "eventos": self.eventos}, f, ensure_ascii=False, indent=2)
+        """Escribe la instantánea completa de forma atómica (temporal + fsync + rename)."""
+        tmp = DATA_FILE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"next_id": self.next_id, "eventos": list(self.eventos.values()),
+                       "reglas": list(self.reglas.values())}, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, DATA_FILE)
+        if hasattr(os, "O_DIRECTORY"):
+            fd = os.open(os.path.dirname(os.path.abspath(DATA_FILE)), os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def compactar(self):
+        """Vuelca todo a la instantánea y vacía el diario."""
+        try:
+            self.guardar_eventos()
+            # Si se corta aquí, el diario se vuelve a aplicar sin efecto: altas y bajas son idempotentes
+            if self.log is not None:
+                self.log.close()
+                self.log = None
+            open(LOG_FILE, "w", encoding="utf-8").close()
+            self.pendientes = 0
+        except OSError as e:
+            messagebox.showerror("Error al guardar", f"No se pudo compactar la agenda: {e}")
 
     def cargar_eventos(self):
+        eventos = {}
         if os.path.exists(DATA_FILE):
             with open(DATA_FILE, "r", encoding="utf-8") as f:
                 datos = json.load(f)
-                self.eventos = datos.get("eventos", [])
+                for evento in datos.get("eventos", []):
+                    eventos[evento["id"]] = evento
+                for regla in datos.get("reglas", []):
+                    self.reglas[regla["id"]] = regla
                 self.next_id = datos.get("next_id", 1)
+        self.reproducir_diario(eventos)
+
+        for evento in eventos.values():
+            self.eventos[evento["id"]] = evento
+            self.claves[evento["id"]] = clave_evento(evento)
+            self.indexar_palabras(evento)
+        # Un solo ordenamiento al cargar; después se mantiene con bisect
+        self.orden = sorted((clave, id_evento) for id_evento, clave in self.claves.items())
+
+    def reproducir_diario(self, eventos):
+        """Aplica sobre `eventos` los cambios del diario posteriores a la instantánea."""
+        if not os.path.exists(LOG_FILE):
+            return
+        valido = 0
+        ignorados = 0
+        with open(LOG_FILE, "rb") as f:
+            for linea in f:
+                # Una línea sin salto final es una escritura interrumpida: se descarta
+                if not linea.endswith(b"\n"):
+                    break
+                valido += len(linea)
+                # Una línea completa pero ilegible se salta sin perder las siguientes
+                try:
+                    registro = json.loads(linea)
+                    if registro["op"] == "alta":
+                        eventos[registro["evento"]["id"]] = registro["evento"]
+                        self.next_id = max(self.next_id, registro["next_id"])
+                    elif registro["op"] == "regla":
+                        self.reglas[registro["regla"]["id"]] = registro["regla"]
+                        self.next_id = max(self.next_id, registro["next_id"])
+                    elif registro["op"] == "baja":
+                        for id_evento in registro["ids"]:
+                            eventos.pop(id_evento, None)
+                            self.reglas.pop(id_evento, None)
+                    else:
+                        raise ValueError("operación desconocida")
+                except (ValueError, KeyError, TypeError):
+                    ignorados += 1
+                    continue
+                self.pendientes += 1
+        if valido < os.path.getsize(LOG_FILE):
+            # Se recorta para que los registros nuevos no queden pegados al incompleto
+            with open(LOG_FILE, "r+b") as f:
+                f.truncate(valido)
+        if ignorados:
+            messagebox.showwarning(
+                "Diario dañado",
+                f"Se ignoraron {ignorados} registro(s) ilegibles de {LOG_FILE}; el resto se aplicó.")
 
     def salir(self):
         if messagebox.askokcancel("Salir", "¿Desea cerrar la aplicación?"):
-            self.guardar_eventos()
+            self.compactar()
             self.destroy()
 
 
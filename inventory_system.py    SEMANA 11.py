@@ -4,17 +4,28 @@ inventory_system.py
 
 Sistema avanzado de gestión de inventario (único archivo).
 - Clases: Producto, Inventario
-- Persistencia en archivo JSON
+- Persistencia en archivo JSON Lines (un producto por línea; lee también el formato JSON anterior)
 - Uso de colecciones: dict, list, set, tuple
 - Menú interactivo por consola
 """
 
 import json
+import mmap
+import os
+import struct
 import uuid
+from array import array
 from dataclasses import dataclass, asdict, field
-from typing import Dict, List, Tuple, Optional, Set
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional, Set
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: sin él se usan los arrays de la librería estándar
+    np = None
 
 INVENTORY_FILENAME = "inventario.json"
+SNAPSHOT_FILENAME = "inventario.col"
 
 
 @dataclass
@@ -48,12 +59,29 @@ class Inventario:
     """
     Clase Inventario:
     - Usa un diccionario para mapear product_id -> Producto (búsqueda O(1) por ID).
-    - Mantiene un set de nombres (lowercase) para búsquedas rápidas por nombre sin duplicados.
+    - Mantiene un multiconjunto de nombres (lowercase -> cantidad de productos) para
+      chequear existencia y contar duplicados en O(1).
+    - Mantiene un índice invertido de trigramas (trigrama -> set de IDs) para
+      búsquedas por nombre parcial sin recorrer todo el inventario.
+    - Mantiene columnas contiguas de cantidad y precio (array 'q'/'d', una posición
+      por producto) y totales acumulados para las consultas de análisis.
     """
     def __init__(self):
         self._productos: Dict[str, Producto] = {}
-        # Set para nombres en minúsculas (ayuda a chequear existencia rápida y búsquedas)
-        self._nombres_set: Set[str] = set()
+        # Conteo de nombres en minúsculas (se permiten nombres repetidos)
+        self._nombres_conteo: Counter = Counter()
+        # Índice de trigramas y datos auxiliares para ordenar/verificar resultados
+        self._trigramas: Dict[str, Set[str]] = {}
+        self._nombres_lower: Dict[str, str] = {}
+        self._orden: Dict[str, int] = {}
+        self._secuencia = 0
+        # Columnas numéricas: posición -> id / cantidad / precio, e id -> posición
+        self._col_ids: List[str] = []
+        self._col_cantidad = array("q")
+        self._col_precio = array("d")
+        self._posicion: Dict[str, int] = {}
+        self._total_items = 0
+        self._valor_total = 0.0
 
     # ---------- Operaciones CRUD ----------
     def generar_id_unico(self) -> str:
@@ -70,25 +98,41 @@ class Inventario:
 
         nuevo = Producto(id=producto_id, nombre=nombre.strip(), cantidad=int(cantidad), precio=float(precio))
         self._productos[nuevo.id] = nuevo
-        self._nombres_set.add(nuevo.nombre.lower())
+        self._indexar(nuevo)
+        self._columnas_agregar(nuevo)
         return nuevo
 
     def eliminar_producto(self, producto_id: str) -> bool:
         """Elimina un producto por ID. Retorna True si se eliminó, False si no existía."""
         if producto_id in self._productos:
-            nombre = self._productos[producto_id].nombre.lower()
+            self._desindexar(self._productos[producto_id])
+            self._columnas_quitar(producto_id)
+            del self._orden[producto_id]
             del self._productos[producto_id]
-            # actualizar set de nombres (recalcular para mayor seguridad)
-            self._recalcular_nombres_set()
             return True
         return False
 
+    def eliminar_productos(self, producto_ids: Iterable[str]) -> int:
+        """Elimina varios productos por ID. Retorna cuántos se eliminaron."""
+        return sum(1 for pid in producto_ids if self.eliminar_producto(pid))
+
     def actualizar_cantidad(self, producto_id: str, nueva_cantidad: int) -> bool:
         """Actualiza la cantidad de un producto. Retorna True si tuvo éxito."""
         p = self._productos.get(producto_id)
         if not p:
             return False
         p.cantidad = int(nueva_cantidad)
+        self._columnas_actualizar(p)
+        return True
+
+    def actualizar_nombre(self, producto_id: str, nuevo_nombre: str) -> bool:
+        """Cambia el nombre de un producto manteniendo los índices. Retorna True si tuvo éxito."""
+        p = self._productos.get(producto_id)
+        if not p:
+            return False
+        self._desindexar(p)
+        p.nombre = nuevo_nombre.strip()
+        self._indexar(p)
         return True
 
     def actualizar_precio(self, producto_id: str, nuevo_precio: float) -> bool:
@@ -97,18 +141,27 @@ class Inventario:
         if not p:
             return False
         p.precio = float(nuevo_precio)
+        self._columnas_actualizar(p)
         return True
 
     # ---------- Búsquedas y listados ----------
     def buscar_por_nombre(self, nombre_parcial: str) -> List[Producto]:
         """Busca productos cuyo nombre contiene la cadena (case-insensitive)."""
         nombre_parcial = nombre_parcial.strip().lower()
-        resultados: List[Producto] = []
-        # recorremos dict (O(n)) pero es razonable; el set ayuda a testear existencia exacta
-        for p in self._productos.values():
-            if nombre_parcial in p.nombre.lower():
-                resultados.append(p)
-        return resultados
+        if len(nombre_parcial) < 3:
+            # Términos de 0-2 caracteres no forman trigramas: recorremos los nombres ya en minúsculas
+            return [p for pid, p in self._productos.items() if nombre_parcial in self._nombres_lower[pid]]
+        # Intersección de listas de postings, empezando por la más corta
+        postings = sorted((self._trigramas.get(t, set()) for t in self._trigramas_de(nombre_parcial)), key=len)
+        candidatos = set(postings[0])
+        for ids in postings[1:]:
+            candidatos &= ids
+            if not candidatos:
+                return []
+        # Los trigramas no garantizan contigüidad: verificamos la subcadena
+        encontrados = [pid for pid in candidatos if nombre_parcial in self._nombres_lower[pid]]
+        encontrados.sort(key=self._orden.__getitem__)
+        return [self._productos[pid] for pid in encontrados]
 
     def obtener_todos(self) -> List[Producto]:
         """Retorna lista con todos los productos (orden no garantizado)."""
@@ -119,38 +172,194 @@ class Inventario:
         return [p.resumen_tuple() for p in self._productos.values()]
 
     def conteo_total_items(self) -> int:
-        """Cuenta total de ítems (suma de cantidades)."""
-        return sum(p.cantidad for p in self._productos.values())
+        """Cuenta total de ítems (suma de cantidades). O(1): se mantiene acumulado."""
+        return self._total_items
+
+    # ---------- Análisis (sobre columnas numéricas) ----------
+    def valor_total_stock(self) -> float:
+        """Valor total del inventario (suma de cantidad * precio). O(1): se mantiene acumulado."""
+        return self._valor_total
+
+    def productos_bajo_stock(self, umbral: int) -> List[Producto]:
+        """Productos con cantidad menor que `umbral`, en orden de inserción."""
+        if np is not None:
+            cantidades = np.frombuffer(self._col_cantidad, dtype=np.int64)
+            posiciones = np.flatnonzero(cantidades < umbral).tolist()
+        else:
+            posiciones = [i for i, c in enumerate(self._col_cantidad) if c < umbral]
+        ids = [self._col_ids[i] for i in posiciones]
+        ids.sort(key=self._orden.__getitem__)
+        return [self._productos[pid] for pid in ids]
+
+    def histograma_precios(self, intervalos: int = 10) -> List[Tuple[float, float, int]]:
+        """Histograma de precios: lista de (desde, hasta, cantidad de productos).
+        Intervalos de igual ancho; el último incluye el precio máximo."""
+        if not self._col_precio:
+            return []
+        if np is not None:
+            conteos, bordes = np.histogram(np.frombuffer(self._col_precio, dtype=np.float64), bins=intervalos)
+            return [(float(bordes[i]), float(bordes[i + 1]), int(conteos[i])) for i in range(intervalos)]
+        minimo, maximo = min(self._col_precio), max(self._col_precio)
+        if minimo == maximo:
+            minimo, maximo = minimo - 0.5, maximo + 0.5
+        ancho = (maximo - minimo) / intervalos
+        conteos = [0] * intervalos
+        for precio in self._col_precio:
+            conteos[min(int((precio - minimo) / ancho), intervalos - 1)] += 1
+        return [(minimo + i * ancho, minimo + (i + 1) * ancho, conteos[i]) for i in range(intervalos)]
+
+    def percentil_precio(self, percentil: float) -> float:
+        """Percentil (0-100) de los precios, con interpolación lineal."""
+        if not self._col_precio:
+            raise ValueError("El inventario está vacío.")
+        if not 0 <= percentil <= 100:
+            raise ValueError("El percentil debe estar entre 0 y 100.")
+        if np is not None:
+            return float(np.percentile(np.frombuffer(self._col_precio, dtype=np.float64), percentil))
+        ordenados = sorted(self._col_precio)
+        pos = (len(ordenados) - 1) * percentil / 100
+        i = int(pos)
+        if i + 1 == len(ordenados):
+            return ordenados[i]
+        return ordenados[i] + (ordenados[i + 1] - ordenados[i]) * (pos - i)
 
     # ---------- Persistencia en archivo ----------
     def guardar_en_archivo(self, filename: str = INVENTORY_FILENAME) -> None:
-        """Serializa el inventario a JSON y escribe en archivo."""
-        serializable = {pid: prod.to_dict() for pid, prod in self._productos.items()}
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(serializable, f, indent=2, ensure_ascii=False)
+        """Escribe el inventario en formato JSON Lines, producto a producto.
+        Se escribe en un archivo temporal que luego reemplaza al original (atómico)."""
+        tmp = filename + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for prod in self._productos.values():
+                f.write(json.dumps(prod.to_dict(), ensure_ascii=False, separators=(",", ":")))
+                f.write("\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, filename)
 
     def cargar_desde_archivo(self, filename: str = INVENTORY_FILENAME) -> None:
-        """Carga inventario desde archivo JSON. Si no existe, mantiene inventario vacío."""
+        """Carga inventario desde archivo (JSON Lines o JSON anterior). Si no existe, mantiene inventario vacío."""
         try:
-            with open(filename, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            self._productos = {pid: Producto.from_dict(prod_dict) for pid, prod_dict in data.items()}
-            self._recalcular_nombres_set()
+            productos = {p.id: p for p in self._leer_productos(filename)}
         except FileNotFoundError:
             # Archivo no existe: dejamos inventario vacío
-            self._productos = {}
-            self._nombres_set = set()
+            productos = {}
         except json.JSONDecodeError as e:
             raise ValueError(f"Error al leer el archivo JSON: {e}")
+        self._productos = productos
+        self._reconstruir_indice()
 
-    def _recalcular_nombres_set(self) -> None:
-        """Recalcula el set de nombres a partir del dict de productos."""
-        self._nombres_set = {p.nombre.lower() for p in self._productos.values()}
+    @staticmethod
+    def _leer_productos(filename: str) -> Iterator[Producto]:
+        """Generador de productos leídos del archivo.
+        Detecta el formato anterior ({id: producto, ...} en un único JSON) y lo carga completo."""
+        with open(filename, "r", encoding="utf-8") as f:
+            primera = f.readline()
+            try:
+                registro = json.loads(primera) if primera.strip() else None
+            except json.JSONDecodeError:
+                registro = None
+            if not isinstance(registro, dict) or not isinstance(registro.get("nombre"), str):
+                # Formato anterior: un solo objeto JSON (normalmente con indent=2)
+                f.seek(0)
+                contenido = f.read()
+                if not contenido.strip():
+                    return
+                for prod_dict in json.loads(contenido).values():
+                    yield Producto.from_dict(prod_dict)
+                return
+            yield Producto.from_dict(registro)
+            for linea in f:
+                if linea.strip():
+                    yield Producto.from_dict(json.loads(linea))
+
+    # ---------- Índices por nombre ----------
+    @staticmethod
+    def _trigramas_de(texto: str) -> Set[str]:
+        """Trigramas (subcadenas de 3 caracteres) de un texto ya en minúsculas."""
+        return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+    def _indexar(self, p: Producto) -> None:
+        """Registra el producto en el conteo de nombres y el índice de trigramas."""
+        nombre = p.nombre.lower()
+        self._nombres_lower[p.id] = nombre
+        self._nombres_conteo[nombre] += 1
+        if p.id not in self._orden:
+            # Posición de inserción: se conserva si solo cambia el nombre
+            self._orden[p.id] = self._secuencia
+            self._secuencia += 1
+        for t in self._trigramas_de(nombre):
+            self._trigramas.setdefault(t, set()).add(p.id)
+
+    def _desindexar(self, p: Producto) -> None:
+        """Quita el producto del conteo de nombres y del índice de trigramas."""
+        nombre = self._nombres_lower.pop(p.id)
+        self._nombres_conteo[nombre] -= 1
+        if not self._nombres_conteo[nombre]:
+            del self._nombres_conteo[nombre]
+        for t in self._trigramas_de(nombre):
+            ids = self._trigramas[t]
+            ids.discard(p.id)
+            if not ids:
+                del self._trigramas[t]
+
+    def _reconstruir_indice(self) -> None:
+        """Reconstruye los índices por nombre y las columnas numéricas a partir del dict de productos."""
+        self._nombres_conteo = Counter()
+        self._trigramas = {}
+        self._nombres_lower = {}
+        self._orden = {}
+        self._secuencia = 0
+        self._col_ids = []
+        self._col_cantidad = array("q")
+        self._col_precio = array("d")
+        self._posicion = {}
+        self._total_items = 0
+        self._valor_total = 0.0
+        for p in self._productos.values():
+            self._indexar(p)
+            self._columnas_agregar(p)
+
+    # ---------- Columnas numéricas ----------
+    def _columnas_agregar(self, p: Producto) -> None:
+        self._posicion[p.id] = len(self._col_ids)
+        self._col_ids.append(p.id)
+        self._col_cantidad.append(p.cantidad)
+        self._col_precio.append(p.precio)
+        self._total_items += p.cantidad
+        self._valor_total += p.cantidad * p.precio
+
+    def _columnas_quitar(self, producto_id: str) -> None:
+        """Quita la fila moviendo la última a su lugar (O(1), columnas sin huecos)."""
+        i = self._posicion.pop(producto_id)
+        self._total_items -= self._col_cantidad[i]
+        self._valor_total -= self._col_cantidad[i] * self._col_precio[i]
+        ultimo = len(self._col_ids) - 1
+        if i != ultimo:
+            self._col_ids[i] = self._col_ids[ultimo]
+            self._col_cantidad[i] = self._col_cantidad[ultimo]
+            self._col_precio[i] = self._col_precio[ultimo]
+            self._posicion[self._col_ids[i]] = i
+        self._col_ids.pop()
+        self._col_cantidad.pop()
+        self._col_precio.pop()
+        if not self._col_ids:
+            self._valor_total = 0.0  # descarta el error de redondeo acumulado
+
+    def _columnas_actualizar(self, p: Producto) -> None:
+        i = self._posicion[p.id]
+        self._total_items += p.cantidad - self._col_cantidad[i]
+        self._valor_total += p.cantidad * p.precio - self._col_cantidad[i] * self._col_precio[i]
+        self._col_cantidad[i] = p.cantidad
+        self._col_precio[i] = p.precio
 
     # ---------- Utilidades ----------
     def existe_nombre(self, nombre: str) -> bool:
         """Chequea (rápido) si existe un nombre de producto (case-insensitive)."""
-        return nombre.strip().lower() in self._nombres_set
+        return nombre.strip().lower() in self._nombres_conteo
+
+    def contar_por_nombre(self, nombre: str) -> int:
+        """Cantidad de productos con ese nombre exacto (case-insensitive)."""
+        return self._nombres_conteo.get(nombre.strip().lower(), 0)
 
     def exportar_csv(self, filename: str) -> None:
         """Exporta el inventario a CSV simple (UTF-8)."""
@@ -161,6 +370,130 @@ class Inventario:
             for p in self._productos.values():
                 writer.writerow([p.id, p.nombre, p.cantidad, p.precio])
 
+    # ---------- Snapshot binario columnar ----------
+    def guardar_snapshot(self, filename: str = SNAPSHOT_FILENAME) -> None:
+        """Guarda el inventario en formato binario columnar (ver InventarioColumnar)."""
+        InventarioColumnar.escribir(self._productos.values(), filename)
+
+    def cargar_snapshot(self, filename: str = SNAPSHOT_FILENAME) -> None:
+        """Carga el inventario desde un snapshot binario columnar."""
+        with InventarioColumnar(filename) as columnar:
+            self._productos = {p.id: p for p in columnar}
+        self._reconstruir_indice()
+
+
+class InventarioColumnar:
+    """
+    Snapshot de solo lectura del inventario en columnas binarias:
+    - cabecera: magic, número de productos y tamaño de la tabla de strings
+    - offsets (array 'q', 2n+1): inicio/fin de id y nombre de cada producto en la tabla
+    - cantidad (array 'q', n) y precio (array 'd', n)
+    - orden (array 'q', n): posiciones ordenadas por id, para buscar por ID con bisección
+    - tabla de strings UTF-8 (ids y nombres concatenados)
+    El archivo se mapea en memoria y las columnas se exponen como memoryview sin copiar;
+    cada Producto se construye solo cuando se pide.
+    """
+    MAGIC = b"INVCOL1\0"
+    _CABECERA = struct.Struct("<8sqq")
+
+    def __init__(self, filename: str = SNAPSHOT_FILENAME):
+        self.filename = filename
+        with open(filename, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n, tam_strings = self._CABECERA.unpack_from(self._mm, 0)
+        if magic != self.MAGIC:
+            self._mm.close()
+            raise ValueError(f"'{filename}' no es un snapshot columnar de inventario.")
+        vista = memoryview(self._mm)
+        pos = self._CABECERA.size
+        columnas = []
+        for fmt, largo in (("q", 2 * n + 1), ("q", n), ("d", n), ("q", n)):
+            columnas.append(vista[pos:pos + 8 * largo].cast(fmt))
+            pos += 8 * largo
+        self._offsets, self.cantidades, self.precios, self._orden = columnas
+        self._strings = vista[pos:pos + tam_strings]
+        self._n = n
+
+    @classmethod
+    def escribir(cls, productos: Iterable[Producto], filename: str = SNAPSHOT_FILENAME) -> None:
+        """Escribe los productos en formato columnar (archivo temporal + reemplazo atómico)."""
+        offsets, cantidades, precios = array("q", [0]), array("q"), array("d")
+        ids: List[str] = []
+        strings = bytearray()
+        for p in productos:
+            ids.append(p.id)
+            strings += p.id.encode("utf-8")
+            offsets.append(len(strings))
+            strings += p.nombre.encode("utf-8")
+            offsets.append(len(strings))
+            cantidades.append(p.cantidad)
+            precios.append(p.precio)
+        orden = array("q", sorted(range(len(ids)), key=ids.__getitem__))
+        # Se rellena la tabla de strings para que el archivo mida un múltiplo de 8
+        tam_strings = len(strings)
+        strings += b"\0" * (-tam_strings % 8)
+
+        tmp = filename + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(cls._CABECERA.pack(cls.MAGIC, len(ids), tam_strings))
+            for columna in (offsets, cantidades, precios, orden):
+                if columna.itemsize != 8:
+                    raise ValueError("Se requieren enteros y flotantes de 8 bytes.")
+                f.write(columna.tobytes())
+            f.write(strings)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, filename)
+
+    def _texto(self, k: int) -> str:
+        return str(self._strings[self._offsets[k]:self._offsets[k + 1]], "utf-8")
+
+    def id_en(self, i: int) -> str:
+        return self._texto(2 * i)
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, i: int) -> Producto:
+        """Producto en la posición i (creado al momento)."""
+        if not -self._n <= i < self._n:
+            raise IndexError(i)
+        i %= self._n
+        return Producto(id=self._texto(2 * i), nombre=self._texto(2 * i + 1),
+                        cantidad=self.cantidades[i], precio=self.precios[i])
+
+    def __iter__(self) -> Iterator[Producto]:
+        for i in range(self._n):
+            yield self[i]
+
+    def obtener(self, producto_id: str) -> Optional[Producto]:
+        """Busca por ID en O(log n) usando la columna de orden."""
+        lo, hi = 0, self._n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.id_en(self._orden[mid]) < producto_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._n and self.id_en(self._orden[lo]) == producto_id:
+            return self[self._orden[lo]]
+        return None
+
+    def conteo_total_items(self) -> int:
+        """Suma de cantidades directamente sobre la columna."""
+        return sum(self.cantidades)
+
+    def cerrar(self) -> None:
+        for vista in (self._offsets, self.cantidades, self.precios, self._orden, self._strings):
+            vista.release()
+        self._mm.close()
+
+    def __enter__(self) -> "InventarioColumnar":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cerrar()
+
 
 # ---------- Interfaz de consola ----------
 def mostrar_menu():
@@ -256,6 +589,7 @@ def main():
                 for p in todos:
                     print(f"- ID: {p.id} | Nombre: {p.nombre} | Cantidad: {p.cantidad} | Precio: {p.precio}")
                 print(f"Total ítems (suma de cantidades): {inv.conteo_total_items()}")
+                print(f"Valor total del stock: {inv.valor_total_stock():.2f}")
 
         elif opcion == "7":
             inv.guardar_en_archivo()
@@ -3,7 +3,18 @@ Sistema de Gestión de Inventarios Mejorado
 Archivo único y simplificado para ejecución directa
 """
 
+import atexit
+import csv
+import hashlib
+import mmap
 import os
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from enum import Enum
 
 # --------------------------
 # Clase Producto
@@ -29,66 +40,724 @@ class Producto:
     def __repr__(self):
         return f"{self.id} | {self.nombre} | Cant: {self.cantidad} | Precio: {self.precio}"
 
+# --------------------------
+# Eventos (el inventario avisa a sus suscriptores en lugar de imprimir)
+# --------------------------
+class TipoEvento(Enum):
+    AÑADIDO = "añadido"
+    YA_EXISTE = "ya_existe"
+    ACTUALIZADO = "actualizado"
+    ELIMINADO = "eliminado"
+    NO_ENCONTRADO = "no_encontrado"
+    ADVERTENCIA = "advertencia"
+    ERROR = "error"
+
+class Evento:
+    def __init__(self, tipo: TipoEvento, idp=None, producto=None, mensaje=None):
+        self.tipo = tipo
+        self.idp = idp
+        self.producto = producto
+        self.mensaje = mensaje  # detalle de ADVERTENCIA / ERROR
+
+    def __str__(self):
+        return MENSAJES[self.tipo].format(e=self)
+
+MENSAJES = {
+    TipoEvento.AÑADIDO: "[OK] Producto añadido",
+    TipoEvento.YA_EXISTE: "[INFO] Producto ya existe",
+    TipoEvento.ACTUALIZADO: "[OK] Producto actualizado",
+    TipoEvento.ELIMINADO: "[OK] Producto eliminado",
+    TipoEvento.NO_ENCONTRADO: "[INFO] Producto no encontrado",
+    TipoEvento.ADVERTENCIA: "[ADVERTENCIA] {e.mensaje}",
+    TipoEvento.ERROR: "[ERROR] {e.mensaje}",
+}
+
+def mostrar_en_consola(evento: Evento):
+    print(evento)
+
+class RegistroEnBuffer:
+    """
+    Suscriptor para operaciones masivas: acumula los eventos de Inventario y los
+    escribe en `archivo` de a `capacidad` líneas. Se usa como context manager, que
+    escribe lo pendiente al salir del bloque:
+
+        with RegistroEnBuffer(open("inventario.log", "a", encoding="utf-8")) as registro:
+            inventario.suscribir(registro)
+            ...
+
+    Sin `with` hay que llamar a vaciar() al terminar. Como respaldo, solo mientras
+    tiene líneas pendientes queda registrado en atexit.
+    """
+    def __init__(self, archivo=None, capacidad=1000):
+        self.archivo = archivo or sys.stdout
+        self.capacidad = capacidad
+        self.lineas = []
+
+    def __call__(self, evento):
+        if not self.lineas:
+            atexit.register(self._al_salir)
+        self.lineas.append(str(evento))
+        if len(self.lineas) >= self.capacidad:
+            self.vaciar()
+
+    def vaciar(self):
+        if self.lineas:
+            self.archivo.write("\n".join(self.lineas) + "\n")
+            self.archivo.flush()
+            self.lineas.clear()
+            atexit.unregister(self._al_salir)  # ya no hace falta retenerlo hasta el final
+
+    def _al_salir(self):
+        # El archivo pudo cerrarse antes que el programa: entonces no hay dónde escribir
+        if not getattr(self.archivo, "closed", False):
+            self.vaciar()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.vaciar()
+
+# --------------------------
+# Lectura perezosa del archivo (mmap + índice)
+# --------------------------
+class ProductosMmap(MutableMapping):
+    """
+    Diccionario id -> Producto respaldado por el archivo mapeado en memoria.
+    - Un índice id -> offset (hash de 64 bits ordenado) vive en `<ruta>.idx`
+      y se reutiliza mientras el mtime y el tamaño del archivo coincidan.
+    - Cada línea se convierte en Producto solo cuando se accede a ella.
+    - Altas, cambios y bajas se guardan aparte, sin tocar el archivo.
+    """
+    _MAGIC = b"INVIDX1\0"
+    _CABECERA = struct.Struct("=8sqqqq")  # magic, mtime_ns, tamaño, registros, limpio
+
+    def __init__(self, ruta, advertir=None):
+        self.ruta = ruta
+        self.ruta_idx = ruta + ".idx"
+        self._advertir = advertir or (lambda mensaje: None)
+        self._mm = None
+        self._mm_idx = None
+        self._tabla = memoryview(b"").cast("Q")
+        self._n = 0
+        self._limpio = True     # sin líneas inválidas ni ids repetidos
+        self._cambios = {}      # id -> Producto (leídos, modificados o nuevos)
+        self._borrados = set()  # ids del archivo eliminados en esta sesión
+        self._len = 0
+        self._abrir()
+
+    # ---------- Índice ----------
+    @staticmethod
+    def _hash(idp: str) -> int:
+        return int.from_bytes(hashlib.blake2b(idp.encode("utf-8"), digest_size=8).digest(), "little")
+
+    def _abrir(self):
+        if not os.path.exists(self.ruta) or os.path.getsize(self.ruta) == 0:
+            return
+        with open(self.ruta, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        st = os.stat(self.ruta)
+        if not self._abrir_indice(st):
+            self._construir_indice(st)
+        self._len = self._n
+
+    def _abrir_indice(self, st) -> bool:
+        """Abre el índice guardado si corresponde a la versión actual del archivo."""
+        try:
+            with open(self.ruta_idx, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+        try:
+            magic, mtime_ns, tam, n, limpio = self._CABECERA.unpack_from(mm, 0)
+        except struct.error:
+            mm.close()
+            return False
+        if (magic, mtime_ns, tam) != (self._MAGIC, st.st_mtime_ns, st.st_size) or \
+                len(mm) != self._CABECERA.size + n * 16:
+            mm.close()
+            return False
+        self._mm_idx = mm
+        self._tabla = memoryview(mm)[self._CABECERA.size:].cast("Q")
+        self._n = n
+        self._limpio = bool(limpio)
+        return True
+
+    def _construir_indice(self, st):
+        """Recorre el archivo una vez y guarda el índice junto a él."""
+        offsets = {}
+        lineas = 0
+        for pos, raw in self._lineas():
+            lineas += 1
+            if raw.strip():
+                line = raw.decode("utf-8")
+                try:
+                    # Igual que la carga completa: si un id se repite gana la última línea
+                    offsets[Producto.from_line(line).id] = pos
+                except Exception:
+                    self._advertir(f"Línea ignorada: {line.strip()}")
+        self._limpio = lineas == len(offsets)
+        tabla = self._tabla_de(offsets)
+        self._tabla = memoryview(tabla)
+        self._n = len(tabla) // 2
+        try:
+            self.escribir_indice(self.ruta, tabla, self._limpio, st)
+        except OSError as e:
+            self._advertir(f"No se pudo guardar el índice: {e}")
+
+    @classmethod
+    def _tabla_de(cls, offsets):
+        """Tabla plana [hash, offset, hash, offset, ...] ordenada por hash."""
+        tabla = array("Q")
+        for h, off in sorted((cls._hash(idp), off) for idp, off in offsets.items()):
+            tabla.append(h)
+            tabla.append(off)
+        return tabla
+
+    @classmethod
+    def escribir_indice(cls, ruta, tabla, limpio=True, st=None):
+        """Guarda `<ruta>.idx` para la versión actual de `ruta` (mtime y tamaño)."""
+        st = st or os.stat(ruta)
+        tmp = ruta + ".idx.tmp"
+        with open(tmp, "wb") as f:
+            f.write(cls._CABECERA.pack(cls._MAGIC, st.st_mtime_ns, st.st_size, len(tabla) // 2, limpio))
+            f.write(tabla.tobytes())
+        os.replace(tmp, ruta + ".idx")
+
+    def _lineas(self):
+        """Recorre el archivo devolviendo (offset, bytes de la línea)."""
+        mm = self._mm
+        pos, total = 0, len(mm)
+        while pos < total:
+            fin = mm.find(b"\n", pos)
+            fin = total if fin == -1 else fin + 1
+            yield pos, mm[pos:fin]
+            pos = fin
+
+    def _linea(self, off: int) -> str:
+        fin = self._mm.find(b"\n", off)
+        if fin == -1:
+            fin = len(self._mm)
+        return self._mm[off:fin].decode("utf-8")
+
+    def _offset(self, idp: str) -> int:
+        """Búsqueda binaria del hash; -1 si el id no está en el archivo."""
+        h = self._hash(idp)
+        tabla = self._tabla
+        lo, hi = 0, self._n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if tabla[2 * mid] < h:
+                lo = mid + 1
+            else:
+                hi = mid
+        while lo < self._n and tabla[2 * lo] == h:
+            off = tabla[2 * lo + 1]
+            if self._linea(off).split("|", 1)[0] == idp:
+                return off
+            lo += 1
+        return -1
+
+    # ---------- Interfaz de diccionario ----------
+    def __getitem__(self, idp):
+        p = self._cambios.get(idp)
+        if p is not None:
+            return p
+        if idp in self._borrados:
+            raise KeyError(idp)
+        off = self._offset(idp)
+        if off == -1:
+            raise KeyError(idp)
+        p = Producto.from_line(self._linea(off))
+        self._cambios[idp] = p
+        return p
+
+    def __contains__(self, idp):
+        try:
+            self[idp]
+            return True
+        except KeyError:
+            return False
+
+    def __setitem__(self, idp, p):
+        if idp not in self:
+            self._len += 1
+        self._borrados.discard(idp)
+        self._cambios[idp] = p
+
+    def __delitem__(self, idp):
+        if idp not in self:
+            raise KeyError(idp)
+        self._cambios.pop(idp, None)
+        self._borrados.add(idp)
+        self._len -= 1
+
+    def __len__(self):
+        return self._len
+
+    def _ids_archivo(self):
+        """(id, offset, bytes) de cada registro vigente del archivo, en orden."""
+        if self._mm is None:
+            return
+        for pos, raw in self._lineas():
+            idp = raw.split(b"|", 1)[0].decode("utf-8")
+            if idp in self._borrados:
+                continue
+            # Si el archivo tiene líneas inválidas o repetidas, solo cuenta la indexada
+            if self._limpio or self._offset(idp) == pos:
+                yield idp, raw
+
+    def __iter__(self):
+        vistos = set()
+        for idp, _ in self._ids_archivo():
+            vistos.add(idp)
+            yield idp
+        for idp in list(self._cambios):
+            if idp not in vistos:
+                yield idp
+
+    def values(self):
+        """Recorre los productos interpretando cada línea directamente (sin búsquedas)."""
+        vistos = set()
+        for idp, raw in self._ids_archivo():
+            vistos.add(idp)
+            p = self._cambios.get(idp)
+            if p is None:
+                p = self._cambios[idp] = Producto.from_line(raw.decode("utf-8"))
+            yield p
+        for idp, p in list(self._cambios.items()):
+            if idp not in vistos:
+                yield p
+
+    def volcar(self, f):
+        """
+        Escribe todos los productos en `f` (binario) copiando tal cual las líneas no
+        modificadas. Retorna la tabla de índice de lo escrito, para no tener que
+        volver a recorrer el archivo nuevo.
+        """
+        if self._mm is not None and self._limpio and \
+                len(self._cambios) + len(self._borrados) <= self._n // 4:
+            return self._volcar_por_tramos(f)
+        vistos = set()
+        offsets = {}
+        pos = 0
+        for idp, raw in self._ids_archivo():
+            vistos.add(idp)
+            p = self._cambios.get(idp)
+            linea = p.to_line().encode("utf-8") if p is not None else raw.rstrip(b"\n") + b"\n"
+            offsets[idp] = pos
+            f.write(linea)
+            pos += len(linea)
+        for idp, p in self._cambios.items():
+            if idp not in vistos:
+                linea = p.to_line().encode("utf-8")
+                offsets[idp] = pos
+                f.write(linea)
+                pos += len(linea)
+        return self._tabla_de(offsets)
+
+    def _volcar_por_tramos(self, f):
+        """
+        Variante de volcar() para pocos cambios sobre un archivo limpio: copia en bloque
+        los tramos sin tocar y corrige los offsets del índice viejo en vez de recorrer
+        el archivo línea por línea.
+        """
+        mm = self._mm
+        tocados = {}  # offset viejo -> id (modificado o borrado)
+        for idp in list(self._cambios) + list(self._borrados):
+            off = self._offset(idp)
+            if off != -1:
+                tocados[off] = idp
+        nuevos = {}       # id -> offset en el archivo nuevo
+        cortes, deltas = [0], [0]  # desde el offset viejo cortes[i] se suma deltas[i]
+        pos = previo = 0
+        for off in sorted(tocados):
+            f.write(mm[previo:off])
+            pos += off - previo
+            fin = mm.find(b"\n", off)
+            fin = len(mm) if fin == -1 else fin + 1
+            idp = tocados[off]
+            p = self._cambios.get(idp)
+            if p is not None:
+                linea = p.to_line().encode("utf-8")
+                nuevos[idp] = pos
+                f.write(linea)
+                pos += len(linea)
+            previo = fin
+            cortes.append(fin)
+            deltas.append(pos - fin)
+        resto = mm[previo:]
+        f.write(resto)
+        pos += len(resto)
+        if resto and not resto.endswith(b"\n"):
+            f.write(b"\n")
+            pos += 1
+        for idp, p in self._cambios.items():
+            if idp not in nuevos and self._offset(idp) == -1:
+                linea = p.to_line().encode("utf-8")
+                nuevos[idp] = pos
+                f.write(linea)
+                pos += len(linea)
+
+        # Índice nuevo: el viejo (ya ordenado por hash) sin los tocados, con offsets
+        # corridos, intercalado con los registros reescritos
+        agregar = sorted((self._hash(idp), off) for idp, off in nuevos.items())
+        agregar.append((1 << 64, 0))
+        tabla = array("Q")
+        viejo = self._tabla
+        j = 0
+        for i in range(0, 2 * self._n, 2):
+            h, off = viejo[i], viejo[i + 1]
+            while agregar[j][0] <= h:
+                tabla.extend(agregar[j])
+                j += 1
+            if off not in tocados:
+                tabla.append(h)
+                tabla.append(off + deltas[bisect_right(cortes, off) - 1])
+        for par in agregar[j:-1]:
+            tabla.extend(par)
+        return tabla
+
+    def reabrir(self):
+        """Vuelve a mapear el archivo después de cerrar(), conservando los cambios en memoria."""
+        n = self._len
+        self._tabla = memoryview(b"").cast("Q")
+        self._n = 0
+        self._abrir()
+        self._len = n
+
+    def cerrar(self):
+        self._tabla.release()
+        if self._mm_idx is not None:
+            self._mm_idx.close()
+            self._mm_idx = None
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
 # --------------------------
 # Clase Inventario
 # --------------------------
 class Inventario:
-    def __init__(self, ruta="inventario.txt"):
+    """
+    Inventario persistido en modo diario (journal):
+    - inventario.txt guarda la última instantánea completa.
+    - inventario.txt.log recibe una línea por cada cambio (O(1) por escritura).
+    - Al superar `umbral_compactacion` cambios se vuelca todo a una nueva
+      instantánea (archivo temporal + fsync + os.replace) y se vacía el log.
+    - Con perezoso=True la instantánea no se lee al iniciar: se mapea en
+      memoria (ProductosMmap) y cada producto se interpreta al consultarlo.
+    - Dentro de `with inv.batch():` los cambios se acumulan en memoria y se
+      escriben de una sola vez al salir; si algo falla se deshacen todos.
+    - No imprime: emite Eventos a los `suscriptores` (ninguno por defecto).
+    """
+    def __init__(self, ruta="inventario.txt", umbral_compactacion=1000, perezoso=False, suscriptores=()):
+        self.suscriptores = list(suscriptores)
         self.ruta = ruta
+        self.ruta_log = ruta + ".log"
+        self.umbral_compactacion = umbral_compactacion
+        self.perezoso = perezoso
         self.productos = {}
+        self._log = None
+        self._pendientes = 0
+        self._lote = None      # registros pendientes del lote en curso
+        self._deshacer = None  # (id, producto anterior o None) para revertir el lote
+        # True si la instantánea o el log no se pudieron leer enteros: compactar
+        # reescribiría la instantánea sin esos datos y vaciaría el log para siempre
+        self._carga_incompleta = False
         self._cargar()
 
     def _cargar(self):
-        if not os.path.exists(self.ruta):
+        if self.perezoso:
+            self.productos = ProductosMmap(self.ruta, self._advertir)
+        elif os.path.exists(self.ruta):
+            try:
+                with open(self.ruta, "r", encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            try:
+                                p = Producto.from_line(line)
+                                self.productos[p.id] = p
+                            except Exception:
+                                self._advertir(f"Línea ignorada: {line.strip()}")
+            except Exception as e:
+                self._carga_incompleta = True
+                self._error(f"No se pudo cargar archivo: {e}")
+        self._reproducir_log()
+
+    def _reproducir_log(self):
+        """Aplica sobre la instantánea los cambios registrados en el log."""
+        if not os.path.exists(self.ruta_log):
             return
+        valido = 0
         try:
-            with open(self.ruta, "r", encoding="utf-8") as f:
-                for line in f:
-                    if line.strip():
-                        try:
-                            p = Producto.from_line(line)
+            with open(self.ruta_log, "rb") as f:
+                for raw in f:
+                    # Una línea sin salto final es una escritura interrumpida: se descarta
+                    if not raw.endswith(b"\n"):
+                        break
+                    valido += len(raw)
+                    try:
+                        # UnicodeDecodeError también es ValueError: solo se pierde esta línea
+                        line = raw.decode("utf-8")
+                        tipo, _, resto = line.partition("|")
+                        if tipo == "P":
+                            p = Producto.from_line(resto)
                             self.productos[p.id] = p
-                        except Exception:
-                            print(f"[ADVERTENCIA] Línea ignorada: {line.strip()}")
+                        elif tipo == "D":
+                            self.productos.pop(resto.rstrip("\n"), None)
+                        else:
+                            raise ValueError("Tipo de registro desconocido")
+                        self._pendientes += 1
+                    except Exception:
+                        texto = raw.decode("utf-8", errors="replace").strip()
+                        self._advertir(f"Registro de log ignorado: {texto}")
+            if valido < os.path.getsize(self.ruta_log):
+                # Recortamos el registro incompleto para que no se mezcle con los nuevos
+                with open(self.ruta_log, "r+b") as f:
+                    f.truncate(valido)
         except Exception as e:
-            print(f"[ERROR] No se pudo cargar archivo: {e}")
+            self._carga_incompleta = True
+            self._error(f"No se pudo leer el log: {e}")
 
-    def _guardar(self):
+    def _registrar(self, registro: str):
+        """Añade un registro al log y lo fuerza a disco antes de confirmar."""
+        if self._lote is not None:
+            self._lote.append(registro)
+            return
         try:
-            with open(self.ruta, "w", encoding="utf-8") as f:
+            if self._log is None:
+                self._log = open(self.ruta_log, "a", encoding="utf-8")
+            self._log.write(registro)
+            self._log.flush()
+            os.fsync(self._log.fileno())
+        except Exception as e:
+            self._error(f"No se pudo guardar: {e}")
+            return
+        self._pendientes += 1
+        if self._pendientes >= self.umbral_compactacion and not self._carga_incompleta:
+            self.compactar()
+
+    def _guardar(self):
+        """Escribe una instantánea completa de forma atómica (tmp + fsync + rename)."""
+        tmp = self.ruta + ".tmp"
+        with open(tmp, "wb") as f:
+            if self.perezoso:
+                tabla = self.productos.volcar(f)
+            else:
                 for p in self.productos.values():
-                    f.write(p.to_line())
+                    f.write(p.to_line().encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        if self.perezoso:
+            # El mapeo apunta al archivo viejo (en Windows impide reemplazarlo): se cierra,
+            # y si el reemplazo falla se vuelve a abrir sin perder los cambios en memoria
+            self.productos.cerrar()
+            try:
+                os.replace(tmp, self.ruta)
+            except OSError:
+                self.productos.reabrir()
+                raise
+            # El índice de la nueva instantánea sale del volcado: no se vuelve a leer el archivo
+            try:
+                ProductosMmap.escribir_indice(self.ruta, tabla)
+            except OSError as e:
+                self._advertir(f"No se pudo guardar el índice: {e}")
+            self.productos = ProductosMmap(self.ruta, self._advertir)
+        else:
+            os.replace(tmp, self.ruta)
+        if hasattr(os, "O_DIRECTORY"):
+            fd = os.open(os.path.dirname(os.path.abspath(self.ruta)), os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def compactar(self):
+        """Vuelca el estado actual a la instantánea y vacía el log."""
+        if self._carga_incompleta:
+            # Los cambios siguen a salvo en el log; se compactará cuando cargue completo
+            self._advertir("No se compacta: la instantánea o el log no se leyeron completos.")
+            return
+        try:
+            self._guardar()
+            # Si se interrumpe aquí, el log se vuelve a aplicar sobre la nueva
+            # instantánea sin efecto: todos los registros son idempotentes.
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            open(self.ruta_log, "w", encoding="utf-8").close()
+            self._pendientes = 0
         except Exception as e:
-            print(f"[ERROR] No se pudo guardar: {e}")
+            self._error(f"No se pudo compactar: {e}")
+
+    def cerrar(self):
+        """Compacta los cambios pendientes y libera el log."""
+        if self._pendientes:
+            self.compactar()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if self.perezoso:
+            self.productos.cerrar()
 
+    # --------------------------
+    # Lotes
+    # --------------------------
+    @contextmanager
+    def batch(self):
+        """Agrupa varias operaciones: una sola escritura al final, o ninguna si falla alguna."""
+        if self._lote is not None:
+            raise RuntimeError("Ya hay un lote en curso")
+        self._lote, self._deshacer = [], []
+        try:
+            yield self
+        except BaseException:
+            for idp, previo in reversed(self._deshacer):
+                if previo is None:
+                    self.productos.pop(idp, None)
+                else:
+                    self.productos[idp] = previo
+            self._lote = self._deshacer = None
+            raise
+        registros = self._lote
+        self._lote = self._deshacer = None
+        self._escribir_lote(registros)
+
+    def _escribir_lote(self, registros):
+        if not registros:
+            return
+        if self._pendientes + len(registros) >= self.umbral_compactacion and not self._carga_incompleta:
+            # Más barato volcar la instantánea que alargar el log
+            self._pendientes += len(registros)
+            self.compactar()
+            return
+        try:
+            if self._log is None:
+                self._log = open(self.ruta_log, "a", encoding="utf-8")
+            self._log.write("".join(registros))
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._pendientes += len(registros)
+        except Exception as e:
+            self._error(f"No se pudo guardar: {e}")
+
+    def aplicar_lote(self, operaciones):
+        """
+        Aplica una secuencia de operaciones como un único lote:
+          ("añadir", Producto) | ("actualizar", id, nombre, cantidad, precio) | ("eliminar", id)
+        Si alguna falla lanza ValueError y el inventario queda como estaba.
+        Retorna la cantidad de operaciones aplicadas.
+        """
+        acciones = {"añadir": self.añadir, "actualizar": self.actualizar, "eliminar": self.eliminar}
+        n = 0
+        with self.batch():
+            for n, (tipo, *args) in enumerate(operaciones, 1):
+                if tipo not in acciones:
+                    raise ValueError(f"Operación {n}: tipo desconocido '{tipo}'")
+                if not acciones[tipo](*args):
+                    raise ValueError(f"Operación {n}: no se pudo {tipo} {args[0]!r}")
+        return n
+
+    def importar_csv(self, ruta_csv):
+        """
+        Importa un CSV de proveedor (id,nombre,cantidad,precio; cabecera opcional).
+        Los IDs nuevos se añaden y los existentes se actualizan, todo en un lote.
+        """
+        operaciones = []
+        with open(ruta_csv, newline="", encoding="utf-8") as f:
+            lector = csv.reader(f)
+            siguiente = 1
+            for fila in lector:
+                # Línea física donde empieza el registro (un campo entre comillas puede ocupar varias)
+                num, siguiente = siguiente, lector.line_num + 1
+                if not fila or (num == 1 and fila[0].strip().lower() == "id"):
+                    continue
+                if len(fila) != 4:
+                    raise ValueError(f"Línea {num}: se esperaban 4 columnas")
+                # El archivo de datos separa con "|" y un registro por línea: to_line no escapa
+                if any(c in campo for campo in fila[:2] for c in "|\r\n"):
+                    raise ValueError(f"Línea {num}: el ID y el nombre no pueden contener '|' ni saltos de línea")
+                try:
+                    p = Producto(fila[0].strip(), fila[1].strip(), int(fila[2]), float(fila[3]))
+                except ValueError:
+                    raise ValueError(f"Línea {num}: cantidad o precio inválidos")
+                operaciones.append(p)
+        # Se decide añadir/actualizar después de leer todo, por si el archivo repite IDs
+        vistos = set()
+        lote = []
+        for p in operaciones:
+            if p.id in self.productos or p.id in vistos:
+                lote.append(("actualizar", p.id, p.nombre, p.cantidad, p.precio))
+            else:
+                lote.append(("añadir", p))
+                vistos.add(p.id)
+        return self.aplicar_lote(lote)
+
+    def _antes_de_cambiar(self, idp):
+        """Dentro de un lote, recuerda el estado previo del producto para poder revertir."""
+        if self._deshacer is not None:
+            p = self.productos.get(idp)
+            copia = None if p is None else Producto(p.id, p.nombre, p.cantidad, p.precio)
+            self._deshacer.append((idp, copia))
+
+    # --------------------------
+    # Eventos
+    # --------------------------
+    def suscribir(self, suscriptor):
+        self.suscriptores.append(suscriptor)
+
+    def _emitir(self, tipo, **datos):
+        if self.suscriptores:
+            evento = Evento(tipo, **datos)
+            for suscriptor in self.suscriptores:
+                suscriptor(evento)
+
+    def _informar(self, tipo, idp, producto=None):
+        # Los lotes no emiten un evento por operación
+        if self._lote is None:
+            self._emitir(tipo, idp=idp, producto=producto)
+
+    def _advertir(self, mensaje):
+        self._emitir(TipoEvento.ADVERTENCIA, mensaje=mensaje)
+
+    def _error(self, mensaje):
+        self._emitir(TipoEvento.ERROR, mensaje=mensaje)
+
+    # --------------------------
+    # Operaciones
+    # --------------------------
     def añadir(self, p: Producto):
         if p.id in self.productos:
-            print("[INFO] Producto ya existe")
+            self._informar(TipoEvento.YA_EXISTE, p.id)
             return False
+        self._antes_de_cambiar(p.id)
         self.productos[p.id] = p
-        self._guardar()
-        print("[OK] Producto añadido")
+        self._registrar("P|" + p.to_line())
+        self._informar(TipoEvento.AÑADIDO, p.id, p)
         return True
 
     def actualizar(self, idp, nombre=None, cantidad=None, precio=None):
         if idp not in self.productos:
-            print("[INFO] Producto no encontrado")
+            self._informar(TipoEvento.NO_ENCONTRADO, idp)
             return False
+        self._antes_de_cambiar(idp)
         p = self.productos[idp]
         if nombre: p.nombre = nombre
         if cantidad is not None: p.cantidad = cantidad
         if precio is not None: p.precio = precio
-        self._guardar()
-        print("[OK] Producto actualizado")
+        self._registrar("P|" + p.to_line())
+        self._informar(TipoEvento.ACTUALIZADO, idp, p)
         return True
 
     def eliminar(self, idp):
         if idp not in self.productos:
-            print("[INFO] Producto no encontrado")
+            self._informar(TipoEvento.NO_ENCONTRADO, idp)
             return False
-        del self.productos[idp]
-        self._guardar()
-        print("[OK] Producto eliminado")
+        self._antes_de_cambiar(idp)
+        p = self.productos.pop(idp)
+        self._registrar(f"D|{idp}\n")
+        self._informar(TipoEvento.ELIMINADO, idp, p)
         return True
 
     def buscar(self, idp):
@@ -107,10 +776,23 @@ def menu():
     print("3. Actualizar")
     print("4. Eliminar")
     print("5. Buscar")
+    print("6. Importar CSV")
     print("0. Salir")
 
+def importar(inv, ruta_csv):
+    try:
+        n = inv.importar_csv(ruta_csv)
+        print(f"[OK] {n} productos importados")
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] Importación cancelada, no se guardó ningún cambio: {e}")
+
 def main():
-    inv = Inventario()
+    inv = Inventario(suscriptores=[mostrar_en_consola])
+    # Uso no interactivo: python "semana 10.py" importar proveedor.csv
+    if len(sys.argv) == 3 and sys.argv[1] == "importar":
+        importar(inv, sys.argv[2])
+        inv.cerrar()
+        return
     while True:
         menu()
         op = input("Opción: ").strip()
@@ -153,7 +835,10 @@ def main():
             idp = input("ID a buscar: ")
             p = inv.buscar(idp)
             print(p if p else "No encontrado")
+        elif op == "6":
+            importar(inv, input("Archivo CSV (id,nombre,cantidad,precio): ").strip())
         elif op == "0":
+            inv.cerrar()
             print("Saliendo...")
             break
         else:
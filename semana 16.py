@@ -7,7 +7,33 @@ Autor: ChatGPT
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import json
+import math
 import os
+import queue
+from bisect import bisect_left, insort
+from itertools import compress, repeat
+from operator import add, contains
+import threading
+
+# A partir de esta cantidad de productos la tabla solo materializa las filas visibles
+LIMITE_TABLA_VIRTUAL = 5000
+# Espera (ms) tras la última edición antes de lanzar el autoguardado
+RETARDO_AUTOGUARDADO_MS = 1500
+# Espera (ms) tras la última tecla antes de filtrar la tabla
+RETARDO_BUSQUEDA_MS = 120
+# Campos en los que busca el filtro de la interfaz
+CAMPOS_BUSQUEDA = ("codigo", "nombre", "descripcion")
+# Para expandir un bitset del índice a un byte 0/1 por producto
+_BITS_A_BYTES = bytes.maketrans(b"01", b"\x00\x01")
+# Clave de orden de cada columna de la tabla (los números se comparan como números)
+CLAVES_ORDEN = {
+    "codigo": lambda p: p.codigo.lower(),
+    "nombre": lambda p: p.nombre.lower(),
+    "descripcion": lambda p: p.descripcion.lower(),
+    "cantidad": lambda p: p.cantidad,
+    "precio": lambda p: p.precio,
+    "valor": lambda p: p.valor_total(),
+}
 
 # ------------------ MODELO ------------------
 
@@ -33,51 +59,366 @@ class Producto:
 
     @staticmethod
     def from_dict(data: dict):
+        cantidad, precio = data["cantidad"], float(data["precio"])
+        if not (math.isfinite(float(cantidad)) and math.isfinite(precio)):
+            # json acepta NaN e Infinity, que rompen la comparación al ordenar por precio o valor
+            raise ValueError(f"Cantidad o precio inválido en el producto {data['codigo']}.")
         return Producto(
             data["codigo"],
             data["nombre"],
             data.get("descripcion", ""),
-            int(data["cantidad"]),
-            float(data["precio"])
+            int(cantidad),
+            precio
         )
 
 
 class Inventario:
+    """
+    Productos en un diccionario ordenado {código: Producto}: alta, cambio, baja y
+    consulta por código en O(1), conservando el orden de alta para la tabla.
+    Para buscar, cada producto tiene un número de secuencia fijo y sus textos en
+    minúsculas se guardan en columnas alineadas por secuencia (las bajas dejan un
+    hueco). El índice, que se construye por tandas con preparar_indice() (mientras
+    tanto se recorren las columnas), guarda por campo, para cada fragmento de 1 a 3
+    letras, los productos que lo contienen como un bitset (bytearray, un bit por
+    secuencia). Además, para cada columna
+    por la que se ordenó alguna vez, una lista ordenada de (clave, secuencia, código).
+    """
     def __init__(self):
-        self.productos = []
+        self._productos = {}
+        self._lista = None    # caché de `productos` (se invalida al agregar/eliminar)
+        self._orden = {}      # código -> secuencia de inserción (orden de la lista)
+        self._secuencia = 0
+        self._por_secuencia = []  # secuencia -> Producto (None si se eliminó)
+        # campo -> textos en minúsculas por secuencia ("" si se eliminó);
+        # "todos" une los tres campos con "\0"
+        self._columnas = {campo: [] for campo in ("todos",) + CAMPOS_BUSQUEDA}
+        self._indice = None   # campo -> {fragmento: bitset} (None: aún no se empezó a construir)
+        self._por_indexar = []  # códigos que faltan agregar al índice en construcción
+        self._version = 0     # cambia con cada alta, cambio o baja
+        self._ultima = None   # (versión, campo, término, productos hallados, sus textos)
+        self._ordenes = {}    # columna -> [(clave, secuencia, código)] ordenada
+
+    @property
+    def productos(self) -> list:
+        """Productos en orden de alta (lista de solo lectura, se regenera tras altas/bajas)."""
+        if self._lista is None:
+            self._lista = list(self._productos.values())
+        return self._lista
+
+    def __len__(self):
+        return len(self._productos)
 
     def agregar(self, producto: Producto):
-        if any(p.codigo == producto.codigo for p in self.productos):
+        if producto.codigo in self._productos:
             raise ValueError(f"El código {producto.codigo} ya existe.")
-        self.productos.append(producto)
+        self._productos[producto.codigo] = producto
+        self._lista = None
+        self._indexar(producto)
 
     def actualizar(self, codigo: str, nuevo: Producto):
-        for i, p in enumerate(self.productos):
-            if p.codigo == codigo:
-                self.productos[i] = nuevo
-                return
-        raise ValueError(f"No se encontró producto con código {codigo}.")
+        if codigo not in self._productos:
+            raise ValueError(f"No se encontró producto con código {codigo}.")
+        if nuevo.codigo != codigo:
+            if nuevo.codigo in self._productos:
+                raise ValueError(f"El código {nuevo.codigo} ya existe.")
+        self._desindexar(self._productos[codigo])
+        if nuevo.codigo != codigo:
+            # Cambio de código (poco frecuente): se reconstruye el dict para conservar la posición
+            self._productos = {(nuevo.codigo if c == codigo else c): p for c, p in self._productos.items()}
+        self._productos[nuevo.codigo] = nuevo
+        self._lista = None
+        self._orden[nuevo.codigo] = self._orden.pop(codigo)
+        self._indexar(nuevo)
+
+    def obtener(self, codigo: str):
+        return self._productos.get(codigo)
 
     def eliminar(self, codigo: str):
-        self.productos = [p for p in self.productos if p.codigo != codigo]
+        p = self._productos.pop(codigo, None)
+        if p is not None:
+            self._lista = None
+            self._desindexar(p)
+            del self._orden[codigo]
+
+    def eliminar_varios(self, codigos) -> int:
+        """Elimina todos los códigos indicados (p. ej. una selección múltiple). Retorna cuántos había."""
+        eliminados = 0
+        for codigo in codigos:
+            p = self._productos.pop(codigo, None)
+            if p is not None:
+                self._desindexar(p)
+                del self._orden[codigo]
+                eliminados += 1
+        if eliminados:
+            self._lista = None
+        return eliminados
 
     def buscar(self, termino: str, campo="nombre"):
+        """Productos cuyo `campo` contiene `termino` (sin distinguir mayúsculas).
+        campo="todos" busca en código, nombre y descripción a la vez."""
+        if campo != "todos" and campo not in CAMPOS_BUSQUEDA:
+            return []
         termino = termino.lower()
-        if campo == "nombre":
-            return [p for p in self.productos if termino in p.nombre.lower()]
-        elif campo == "codigo":
-            return [p for p in self.productos if termino in p.codigo.lower()]
-        return []
+        if not termino:
+            return list(self.productos)
+        # Si el término contiene al anterior (lo normal al ir tipeando), solo puede
+        # coincidir con lo ya hallado
+        ultima = self._ultima
+        if ultima is not None and not (ultima[0] == self._version and ultima[1] == campo
+                                       and ultima[2] in termino):
+            ultima = None
+        bits, exacta = self._bits(campo, termino)
+        if bits is None:
+            # Índice en construcción: se recorre lo hallado antes o la columna entera
+            productos, textos = (ultima[3], ultima[4]) if ultima else \
+                (self._por_secuencia, self._columnas[campo])
+        else:
+            unos = bin(bits)
+            # Costo en comparaciones `in`: usar el índice recorre dos columnas enteras
+            # en C (como ~n/4 comparaciones) y luego verifica a los candidatos
+            costo_indice = len(self._por_secuencia) // 4 + (0 if exacta else unos.count("1"))
+            if ultima is not None and len(ultima[3]) <= costo_indice:
+                productos, textos = ultima[3], ultima[4]
+            else:
+                # Un byte 0/1 por secuencia; compress toma las que tienen bit en 1
+                mascara = unos[:1:-1].encode("ascii").translate(_BITS_A_BYTES)
+                productos = list(compress(self._por_secuencia, mascara))
+                textos = list(compress(self._columnas[campo], mascara))
+                if exacta:
+                    self._ultima = (self._version, campo, termino, productos, textos)
+                    return list(productos)
+        # `termino in texto` para cada candidato, también en C y en orden de alta
+        mascara = list(map(contains, textos, repeat(termino)))
+        productos = list(compress(productos, mascara))
+        self._ultima = (self._version, campo, termino, productos, list(compress(textos, mascara)))
+        return list(productos)
+
+    def _bits(self, campo, termino):
+        """
+        (bitset, exacto): las secuencias que según el índice pueden contener `termino`,
+        y si además lo contienen seguro. (None, False) si el índice no está listo.
+        """
+        if not self.indice_listo():
+            return None, False
+        # Hasta 3 letras el término es un fragmento indexado; si es más largo, los
+        # bits solo dicen que cada uno de sus trigramas aparece en el campo
+        fragmentos = {termino} if len(termino) <= 3 else self._trigramas(termino)
+        bits = 0
+        for c in (CAMPOS_BUSQUEDA if campo == "todos" else (campo,)):
+            tabla, en_campo = self._indice[c], -1
+            for g in fragmentos:
+                en_campo &= int.from_bytes(tabla.get(g, b""), "little")
+                if not en_campo:
+                    break
+            bits |= en_campo
+        return bits, len(termino) <= 3
+
+    # --- Índice de búsqueda ---
+    @staticmethod
+    def _trigramas(texto: str) -> set:
+        return {texto[i:i + 3] for i in range(len(texto) - 2)}
 
-    def guardar(self, archivo="inventario.json"):
-        with open(archivo, "w", encoding="utf-8") as f:
-            json.dump([p.to_dict() for p in self.productos], f, indent=4)
+    @staticmethod
+    def _fragmentos(texto: str) -> set:
+        """Todas las subcadenas de 1 a 3 letras de `texto` (armadas con map, en C)."""
+        pares = list(map(add, texto, texto[1:]))
+        return set(texto).union(pares, map(add, pares, texto[2:]))
+
+    def _indexar_textos(self, textos, s: int):
+        """Pone en 1 el bit de la secuencia `s` en cada fragmento de sus textos."""
+        byte, bit = s >> 3, 1 << (s & 7)
+        for campo, texto in zip(CAMPOS_BUSQUEDA, textos):
+            tabla = self._indice[campo]
+            for g in self._fragmentos(texto):
+                bits = tabla.get(g)
+                if bits is None:
+                    bits = tabla[g] = bytearray(byte + 1)
+                elif len(bits) <= byte:
+                    bits.extend(bytes(byte + 1 - len(bits)))
+                bits[byte] |= bit
+
+    def indice_listo(self) -> bool:
+        return self._indice is not None and not self._por_indexar
+
+    def preparar_indice(self, limite=150) -> bool:
+        """
+        Agrega al índice los siguientes `limite` productos (la primera vez lo crea
+        vacío). Retorna True cuando está completo. Las altas, cambios y bajas
+        intermedias lo mantienen al día: indexar dos veces el mismo texto no cambia nada
+        y los códigos que ya no existen se saltan.
+        """
+        if self._indice is None:
+            self._indice = {campo: {} for campo in CAMPOS_BUSQUEDA}
+            self._por_indexar = list(self._orden)
+        tanda = self._por_indexar[-limite:]
+        del self._por_indexar[-limite:]
+        for codigo in tanda:
+            s = self._orden.get(codigo)
+            if s is not None:
+                self._indexar_textos(self._columnas["todos"][s].split("\0"), s)
+        return not self._por_indexar
+
+    def _indexar(self, p: Producto):
+        textos = [str(getattr(p, campo)).lower() for campo in CAMPOS_BUSQUEDA]
+        if p.codigo not in self._orden:
+            self._orden[p.codigo] = self._secuencia
+            self._secuencia += 1
+            self._por_secuencia.append(None)
+            for columna in self._columnas.values():
+                columna.append("")
+        s = self._orden[p.codigo]
+        self._por_secuencia[s] = p
+        for campo, texto in zip(CAMPOS_BUSQUEDA, textos):
+            self._columnas[campo][s] = texto
+        self._columnas["todos"][s] = "\0".join(textos)
+        self._version += 1
+        if self._indice is not None:
+            self._indexar_textos(textos, s)
+        for columna, entradas in self._ordenes.items():
+            insort(entradas, (CLAVES_ORDEN[columna](p), s, p.codigo))
+
+    def _desindexar(self, p: Producto):
+        codigo = p.codigo
+        s = self._orden[codigo]
+        for columna, entradas in list(self._ordenes.items()):
+            i = bisect_left(entradas, (CLAVES_ORDEN[columna](p), s, codigo))
+            if i < len(entradas) and entradas[i][2] == codigo:
+                del entradas[i]
+            else:
+                # La lista no está bien ordenada (claves no comparables): se descarta
+                # y ordenados() la rehace la próxima vez que se pida
+                del self._ordenes[columna]
+        textos = self._columnas["todos"][s].split("\0")
+        self._por_secuencia[s] = None
+        for columna in self._columnas.values():
+            columna[s] = ""
+        self._version += 1
+        if self._indice is None:
+            return
+        byte, bit = s >> 3, ~(1 << (s & 7)) & 0xFF
+        for campo, texto in zip(CAMPOS_BUSQUEDA, textos):
+            tabla = self._indice[campo]
+            for g in self._fragmentos(texto):
+                bits = tabla.get(g)
+                if bits is not None and byte < len(bits):  # puede no estar indexado aún
+                    bits[byte] &= bit
+
+    def _reconstruir_indice(self):
+        # Secuencias nuevas y sin huecos; el índice vuelve a armarse por tandas
+        self._orden, self._secuencia, self._por_secuencia = {}, 0, []
+        self._columnas = {campo: [] for campo in self._columnas}
+        self._indice = self._ultima = None
+        self._por_indexar = []
+        self._ordenes = {}
+        for p in self.productos:
+            self._indexar(p)
+
+    # --- Orden por columnas ---
+    def ordenados(self, columna: str, descendente=False) -> list:
+        """Productos ordenados por `columna`. El primer pedido ordena (O(n log n));
+        después la lista se mantiene al día con cada alta, cambio o baja."""
+        entradas = self._ordenes.get(columna)
+        if entradas is None:
+            clave = CLAVES_ORDEN[columna]
+            entradas = sorted((clave(p), self._orden[c], c) for c, p in self._productos.items())
+            self._ordenes[columna] = entradas
+        return [self._productos[c] for _, _, c in (reversed(entradas) if descendente else entradas)]
+
+    def instantanea(self) -> list:
+        """Copia serializable del inventario (se toma en el hilo de Tk, se escribe en otro)."""
+        return [p.to_dict() for p in self.productos]
 
-    def cargar(self, archivo="inventario.json"):
+    @staticmethod
+    def escribir(datos: list, archivo="inventario.json"):
+        """Escribe una instantánea: archivo temporal + reemplazo atómico."""
+        tmp = archivo + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(datos, f, indent=4)
+        os.replace(tmp, archivo)
+
+    def guardar(self, archivo="inventario.json"):
+        self.escribir(self.instantanea(), archivo)
+
+    def cargar(self, archivo="inventario.json") -> list:
+        """
+        Carga el inventario guardado. Un producto dañado (campo faltante, número
+        inválido, NaN o infinito) se salta sin abortar la carga; retorna la lista de
+        los omitidos como textos "fila N: motivo" para avisar al usuario.
+        """
+        omitidos = []
         if os.path.exists(archivo):
             with open(archivo, "r", encoding="utf-8") as f:
                 data = json.load(f)
-                self.productos = [Producto.from_dict(p) for p in data]
+                self._productos = {}
+                for n, d in enumerate(data, start=1):
+                    try:
+                        p = Producto.from_dict(d)
+                    except KeyError as e:
+                        omitidos.append(f"fila {n}: falta el campo {e}")
+                        continue
+                    except (ValueError, TypeError) as e:
+                        omitidos.append(f"fila {n}: {e}")
+                        continue
+                    self._productos[p.codigo] = p
+                self._lista = None
+            self._reconstruir_indice()
+        return omitidos
+
+
+class GuardadoEnSegundoPlano:
+    """
+    Hilo de escritura para no bloquear el mainloop de Tk.
+    - solicitar(datos) deja la instantánea pendiente; si llegan varias antes de
+      que el hilo la tome, solo se escribe la última (se agrupan).
+    - Los resultados (None o la excepción) quedan en `resultados` para que la
+      interfaz los lea desde su propio hilo con root.after.
+    """
+    def __init__(self, archivo="inventario.json"):
+        self.archivo = archivo
+        self.resultados = queue.Queue()
+        self._cond = threading.Condition()
+        self._pendiente = None
+        self._escribiendo = False
+        self._detener = False
+        self._hilo = threading.Thread(target=self._trabajar, name="guardado-inventario", daemon=True)
+        self._hilo.start()
+
+    def solicitar(self, datos: list):
+        with self._cond:
+            self._pendiente = datos
+            self._cond.notify()
+
+    def ocupado(self) -> bool:
+        with self._cond:
+            return self._pendiente is not None or self._escribiendo
+
+    def detener(self):
+        """Termina el hilo después de escribir lo que esté pendiente."""
+        with self._cond:
+            self._detener = True
+            self._cond.notify()
+        self._hilo.join()
+
+    def _trabajar(self):
+        while True:
+            with self._cond:
+                while self._pendiente is None and not self._detener:
+                    self._cond.wait()
+                if self._pendiente is None:
+                    return
+                datos, self._pendiente = self._pendiente, None
+                self._escribiendo = True
+            try:
+                Inventario.escribir(datos, self.archivo)
+                error = None
+            except Exception as e:
+                error = e
+            with self._cond:
+                # El resultado entra antes de bajar la bandera: quien vea ocupado() == False
+                # ya lo encuentra en la cola
+                self.resultados.put(error)
+                self._escribiendo = False
 
 
 # ------------------ VISTA / CONTROLADOR ------------------
@@ -87,10 +428,50 @@ class InventarioApp:
         self.root = root
         self.root.title("Sistema de Gestión de Inventario")
         self.inventario = Inventario()
-        self.inventario.cargar()
+        try:
+            omitidos = self.inventario.cargar()
+        except (OSError, ValueError) as e:
+            # Archivo ilegible entero: se arranca vacío en lugar de no abrir la ventana
+            omitidos = []
+            messagebox.showerror("Error", f"No se pudo cargar el inventario: {e}\n"
+                                          "Se empieza con el inventario vacío.")
+        if omitidos:
+            messagebox.showwarning(
+                "Inventario dañado",
+                f"Se omitieron {len(omitidos)} producto(s) ilegibles; no se incluirán al guardar:\n"
+                + "\n".join(omitidos[:10]) + ("\n..." if len(omitidos) > 10 else ""))
+
+        # Estado de la tabla: valores mostrados por código (iid) y ventana visible en modo virtual
+        self._filas = {}
+        self._virtual = False
+        self._inicio = 0
+        self._filas_pagina = 20
+
+        # Guardado en segundo plano y autoguardado opcional
+        self.guardador = GuardadoEnSegundoPlano()
+        self.autoguardado = tk.BooleanVar(value=False)
+        self._autoguardado_id = None
+        self._avisar_guardado = False
+        self._sondeando = False
+
+        # Filtro de búsqueda (None = todo el inventario), orden de columna y filas resultantes
+        self._filtro = None
+        self._busqueda_id = None
+        self._orden_col = None
+        self._orden_desc = False
+        self._vista = None
 
         self._crear_widgets()
         self._refrescar_tabla()
+        self.root.protocol("WM_DELETE_WINDOW", self.cerrar)
+        # El índice de búsqueda se arma por tandas entre eventos, sin congelar la ventana
+        self._indexado_id = self.root.after(1, self._preparar_indice)
+
+    def _preparar_indice(self):
+        if self.inventario.preparar_indice():
+            self._indexado_id = None
+        else:
+            self._indexado_id = self.root.after(1, self._preparar_indice)
 
     def _crear_widgets(self):
         # --- Formulario ---
@@ -113,22 +494,160 @@ class InventarioApp:
         ttk.Button(frm_btn, text="Actualizar", command=self.actualizar_producto).pack(side="left", padx=5)
         ttk.Button(frm_btn, text="Eliminar", command=self.eliminar_producto).pack(side="left")
         ttk.Button(frm_btn, text="Guardar", command=self.guardar_inventario).pack(side="right")
+        ttk.Checkbutton(frm_btn, text="Autoguardado", variable=self.autoguardado,
+                        command=self._programar_autoguardado).pack(side="right", padx=5)
+
+        # --- Búsqueda ---
+        frm_buscar = ttk.Frame(self.root)
+        frm_buscar.pack(padx=10, pady=(5, 0), fill="x")
+        ttk.Label(frm_buscar, text="Buscar (código, nombre o descripción):").pack(side="left")
+        self.busqueda = tk.StringVar()
+        ttk.Entry(frm_buscar, textvariable=self.busqueda).pack(side="left", fill="x", expand=True, padx=5)
+        self.busqueda.trace_add("write", self._al_escribir_busqueda)
 
         # --- Tabla ---
-        self.tree = ttk.Treeview(self.root, columns=("codigo", "nombre", "descripcion", "cantidad", "precio", "valor"), show="headings")
-        self.tree.pack(fill="both", expand=True, padx=10, pady=5)
+        frm_tabla = ttk.Frame(self.root)
+        frm_tabla.pack(fill="both", expand=True, padx=10, pady=5)
+
+        self.tree = ttk.Treeview(frm_tabla, columns=("codigo", "nombre", "descripcion", "cantidad", "precio", "valor"), show="headings")
+        self.scroll = ttk.Scrollbar(frm_tabla, orient="vertical", command=self._desplazar)
+        self.tree.configure(yscrollcommand=self._yscroll)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scroll.pack(side="right", fill="y")
 
         for col in self.tree["columns"]:
-            self.tree.heading(col, text=col.capitalize())
+            self.tree.heading(col, text=col.capitalize(), command=lambda c=col: self._ordenar_por(c))
             self.tree.column(col, anchor="center")
 
         self.tree.bind("<<TreeviewSelect>>", self.seleccionar_producto)
+        self.tree.bind("<Configure>", self._al_redimensionar)
+        for evento in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(evento, self._rueda)
+
+        # --- Estado ---
+        self.lbl_estado = ttk.Label(self.root, text="")
+        self.lbl_estado.pack(side="bottom", fill="x", padx=10, pady=(0, 5))
+
+    # --- Sincronización modelo -> tabla ---
+    @staticmethod
+    def _valores_fila(p: Producto) -> tuple:
+        return (p.codigo, p.nombre, p.descripcion, p.cantidad, f"{p.precio:.2f}", f"{p.valor_total():.2f}")
+
+    def _fuente(self):
+        """Productos que debe mostrar la tabla (inventario o filtro, en el orden elegido)."""
+        if self._vista is None:
+            if self._orden_col is None:
+                self._vista = self.inventario.productos if self._filtro is None else self._filtro
+            elif self._filtro is None:
+                self._vista = self.inventario.ordenados(self._orden_col, self._orden_desc)
+            else:
+                self._vista = sorted(self._filtro, key=CLAVES_ORDEN[self._orden_col], reverse=self._orden_desc)
+        return self._vista
 
     def _refrescar_tabla(self):
-        for row in self.tree.get_children():
-            self.tree.delete(row)
-        for p in self.inventario.productos:
-            self.tree.insert("", "end", values=(p.codigo, p.nombre, p.descripcion, p.cantidad, f"{p.precio:.2f}", f"{p.valor_total():.2f}"))
+        """Lleva la tabla al estado del modelo tocando solo las filas que cambiaron."""
+        productos = self._fuente()
+        self._virtual = len(productos) > LIMITE_TABLA_VIRTUAL
+        if self._virtual:
+            self._inicio = max(0, min(self._inicio, len(productos) - self._filas_pagina))
+            visibles = productos[self._inicio:self._inicio + self._filas_pagina]
+            self._actualizar_scroll_virtual()
+        else:
+            self._inicio = 0
+            visibles = productos
+        self._sincronizar_filas(visibles)
+
+    def _refrescar_filas(self, codigos):
+        """Actualiza solo las filas de los códigos indicados (alta, cambio o baja)."""
+        self._vista = None
+        if self._filtro is not None or self._orden_col is not None:
+            # El producto puede entrar o salir del filtro o cambiar de posición: se recalcula
+            # la vista (índices ya mantenidos) y el diff mueve/inserta solo lo necesario
+            if self._filtro is not None:
+                self._filtro = self.inventario.buscar(self.busqueda.get().strip(), "todos")
+            self._refrescar_tabla()
+            return
+        virtual = len(self.inventario.productos) > LIMITE_TABLA_VIRTUAL
+        if virtual or self._virtual:
+            # En modo virtual la página visible puede desplazarse: se recalcula entera (es pequeña)
+            self._refrescar_tabla()
+            return
+        borrar = []
+        for codigo in codigos:
+            p = self.inventario.obtener(codigo)
+            if p is None:
+                if self._filas.pop(codigo, None) is not None:
+                    borrar.append(codigo)
+                continue
+            valores = self._valores_fila(p)
+            previo = self._filas.get(codigo)
+            if previo is None:
+                self.tree.insert("", "end", iid=codigo, values=valores)
+            elif previo != valores:
+                self.tree.item(codigo, values=valores)
+            self._filas[codigo] = valores
+        if borrar:
+            self.tree.delete(*borrar)
+
+    def _sincronizar_filas(self, visibles):
+        """Deja en la tabla exactamente `visibles`, en ese orden, con inserciones/movimientos mínimos."""
+        deseados = {p.codigo for p in visibles}
+        sobrantes = [c for c in self._filas if c not in deseados]
+        if sobrantes:
+            self.tree.delete(*sobrantes)
+            for c in sobrantes:
+                del self._filas[c]
+        actuales = list(self.tree.get_children())
+        for i, p in enumerate(visibles):
+            valores = self._valores_fila(p)
+            previo = self._filas.get(p.codigo)
+            if previo is None:
+                self.tree.insert("", i, iid=p.codigo, values=valores)
+                actuales.insert(i, p.codigo)
+            else:
+                if actuales[i] != p.codigo:
+                    self.tree.move(p.codigo, "", i)
+                    actuales.remove(p.codigo)
+                    actuales.insert(i, p.codigo)
+                if previo != valores:
+                    self.tree.item(p.codigo, values=valores)
+            self._filas[p.codigo] = valores
+
+    # --- Desplazamiento (modo virtual) ---
+    def _yscroll(self, primero, ultimo):
+        # En modo virtual la barra refleja la posición en el inventario, no en el Treeview
+        if not self._virtual:
+            self.scroll.set(primero, ultimo)
+
+    def _actualizar_scroll_virtual(self):
+        total = len(self._fuente())
+        self.scroll.set(self._inicio / total, min(1.0, (self._inicio + self._filas_pagina) / total))
+
+    def _desplazar(self, accion, cantidad, unidad=None):
+        if not self._virtual:
+            self.tree.yview(accion, cantidad, *(unidad,) if unidad else ())
+            return
+        if accion == "moveto":
+            self._inicio = int(float(cantidad) * len(self._fuente()))
+        elif accion == "scroll":
+            paso = self._filas_pagina if unidad == "pages" else 1
+            self._inicio += int(cantidad) * paso
+        self._refrescar_tabla()
+
+    def _rueda(self, event):
+        if not self._virtual:
+            return None
+        pasos = -1 if event.num == 4 or event.delta > 0 else 1
+        self._desplazar("scroll", pasos * 3, "units")
+        return "break"
+
+    def _al_redimensionar(self, event):
+        alto_fila = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        filas = max(1, (event.height - 25) // alto_fila)
+        if filas != self._filas_pagina:
+            self._filas_pagina = filas
+            if self._virtual:
+                self._refrescar_tabla()
 
     def _leer_formulario(self) -> Producto:
         try:
@@ -139,6 +658,8 @@ class InventarioApp:
             precio = float(self.entries["precio"].get())
             if not codigo or not nombre:
                 raise ValueError("Código y Nombre son obligatorios.")
+            if not math.isfinite(precio):
+                raise ValueError("El precio debe ser un número finito.")
             return Producto(codigo, nombre, descripcion, cantidad, precio)
         except Exception as e:
             messagebox.showerror("Error", str(e))
@@ -149,7 +670,8 @@ class InventarioApp:
         if producto:
             try:
                 self.inventario.agregar(producto)
-                self._refrescar_tabla()
+                self._refrescar_filas([producto.codigo])
+                self._programar_autoguardado()
                 messagebox.showinfo("Éxito", "Producto agregado.")
             except ValueError as e:
                 messagebox.showerror("Error", str(e))
@@ -159,7 +681,8 @@ class InventarioApp:
         if producto:
             try:
                 self.inventario.actualizar(producto.codigo, producto)
-                self._refrescar_tabla()
+                self._refrescar_filas([producto.codigo])
+                self._programar_autoguardado()
                 messagebox.showinfo("Éxito", "Producto actualizado.")
             except ValueError as e:
                 messagebox.showerror("Error", str(e))
@@ -169,20 +692,107 @@ class InventarioApp:
         if not sel:
             messagebox.showwarning("Atención", "Selecciona un producto para eliminar.")
             return
-        codigo = self.tree.item(sel[0])["values"][0]
-        self.inventario.eliminar(codigo)
+        # Se eliminan todas las filas seleccionadas de una vez
+        eliminados = self.inventario.eliminar_varios(sel)
+        self._refrescar_filas(sel)
+        self._programar_autoguardado()
+        messagebox.showinfo("Éxito", "Producto eliminado." if eliminados == 1 else f"{eliminados} productos eliminados.")
+
+    # --- Búsqueda ---
+    def _al_escribir_busqueda(self, *args):
+        # Cada tecla cancela la consulta pendiente: solo se ejecuta la última
+        if self._busqueda_id is not None:
+            self.root.after_cancel(self._busqueda_id)
+        self._busqueda_id = self.root.after(RETARDO_BUSQUEDA_MS, self._aplicar_busqueda)
+
+    def _aplicar_busqueda(self):
+        self._busqueda_id = None
+        termino = self.busqueda.get().strip()
+        self._filtro = self.inventario.buscar(termino, "todos") if termino else None
+        self._vista = None
+        self._inicio = 0
+        self._refrescar_tabla()
+
+    # --- Orden ---
+    def _ordenar_por(self, columna):
+        """Clic en un encabezado: ordena por esa columna; otro clic invierte el sentido."""
+        if self._orden_col == columna:
+            self._orden_desc = not self._orden_desc
+        else:
+            if self._orden_col is not None:
+                self.tree.heading(self._orden_col, text=self._orden_col.capitalize())
+            self._orden_col, self._orden_desc = columna, False
+        flecha = " ▼" if self._orden_desc else " ▲"
+        self.tree.heading(columna, text=columna.capitalize() + flecha)
+        self._vista = None
+        # Las filas ya existen: _sincronizar_filas solo las reordena con tree.move
         self._refrescar_tabla()
-        messagebox.showinfo("Éxito", "Producto eliminado.")
 
+    # --- Guardado ---
     def guardar_inventario(self):
-        self.inventario.guardar()
-        messagebox.showinfo("Éxito", "Inventario guardado en archivo.")
+        self._avisar_guardado = True
+        self._guardar_en_segundo_plano()
+
+    def _guardar_en_segundo_plano(self):
+        self._autoguardado_id = None
+        self.guardador.solicitar(self.inventario.instantanea())
+        self.lbl_estado.config(text="Guardando...")
+        if not self._sondeando:
+            self._sondeando = True
+            self.root.after(100, self._revisar_guardado)
+
+    def _revisar_guardado(self):
+        """Recoge en el hilo de Tk los resultados del hilo de guardado."""
+        # Se pregunta antes de vaciar la cola: si el hilo termina entre medio, su
+        # resultado ya está en la cola cuando se lee
+        ocupado = self.guardador.ocupado()
+        error = None
+        try:
+            while True:
+                error = self.guardador.resultados.get_nowait() or error
+        except queue.Empty:
+            pass
+        if error is not None:
+            self._avisar_guardado = False
+            self.lbl_estado.config(text="Error al guardar.")
+            messagebox.showerror("Error", f"No se pudo guardar el inventario: {error}")
+        if ocupado:
+            self.root.after(100, self._revisar_guardado)
+            return
+        self._sondeando = False
+        if error is None:
+            self.lbl_estado.config(text="Inventario guardado.")
+            if self._avisar_guardado:
+                messagebox.showinfo("Éxito", "Inventario guardado en archivo.")
+        self._avisar_guardado = False
+
+    def _programar_autoguardado(self):
+        """Reinicia la espera del autoguardado: se guarda cuando las ediciones se calman."""
+        if self._autoguardado_id is not None:
+            self.root.after_cancel(self._autoguardado_id)
+            self._autoguardado_id = None
+        if self.autoguardado.get():
+            self._autoguardado_id = self.root.after(RETARDO_AUTOGUARDADO_MS, self._guardar_en_segundo_plano)
+
+    def cerrar(self):
+        if self._indexado_id is not None:
+            self.root.after_cancel(self._indexado_id)
+        # Con autoguardado, lo pendiente se escribe antes de salir
+        if self._autoguardado_id is not None:
+            self.root.after_cancel(self._autoguardado_id)
+            self.guardador.solicitar(self.inventario.instantanea())
+        self.guardador.detener()
+        self.root.destroy()
 
     def seleccionar_producto(self, event):
         sel = self.tree.selection()
         if not sel:
             return
-        valores = self.tree.item(sel[0])["values"]
+        # Se lee del modelo por iid: los valores del Treeview convierten "001" en 1
+        p = self.inventario.obtener(sel[0])
+        if p is None:
+            return
+        valores = self._valores_fila(p)
         self.entries["código"].delete(0, "end"); self.entries["código"].insert(0, valores[0])
         self.entries["nombre"].delete(0, "end"); self.entries["nombre"].insert(0, valores[1])
         self.entries["descripción"].delete(0, "end"); self.entries["descripción"].insert(0, valores[2])